@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark suite for the searches in `search.py`. Generates random mazes in
+the `Maze` file format from (size, wall density, number of waypoints, seed), runs
+every applicable search method on each of them in a fresh worker process, and writes
+wall time, states explored, peak RSS and path length to a CSV file. Single-goal
+methods are only run on mazes with exactly one waypoint. With `--profile`, each run is
+done under cProfile and the number of Python-level function calls is recorded too
+(profiling inflates the wall time, so compare times from unprofiled runs).
+
+With `--scaling` the suite instead times the single-goal methods on open mazes (walls
+only on the border, start and waypoint in opposite corners) of each size and reports
+wall time per cell, which should stay roughly flat if the search is linear in the
+number of cells.
+"""
+
+import argparse, cProfile, csv, itertools, os, pstats, random, shutil, tempfile, time
+
+from maze import Maze
+from util import fresh_worker_pool, peak_memory_kb, time_limit, Timeout
+import search
+
+# (method, needs exactly one waypoint)
+METHODS = (
+    ('bfs',                 True),
+    ('astar_single',        True),
+    ('bidirectional_bfs',   True),
+    ('bidirectional_astar', True),
+    ('jps',                 True),
+    ('astar_multiple',      False),
+    ('fast',                False),
+    ('astar_reduced',       False),
+    ('held_karp',           False),
+)
+
+FIELDS = ('size', 'density', 'waypoints', 'seed', 'method', 'status',
+    'path_length', 'states_explored', 'wall_time', 'peak_rss_kb', 'python_calls')
+
+def random_maze(size, density, waypoints, seed):
+    """
+    Returns the rows of a random `size` x `size` maze: interior cells are walls with
+    probability `density`, open cells not connected to the start are walled off, and
+    `waypoints` waypoints are placed on distinct reachable cells.
+    """
+    rng     = random.Random(seed)
+    grid    = [['%' if i in (0, size - 1) or j in (0, size - 1) or rng.random() < density else ' '
+        for j in range(size)] for i in range(size)]
+    cells   = [(i, j) for i in range(1, size - 1) for j in range(1, size - 1) if grid[i][j] == ' ']
+    if len(cells) < waypoints + 1:
+        raise ValueError('maze of size {0} with density {1} has too few open cells'.format(size, density))
+
+    start   = rng.choice(cells)
+    reached = {start}
+    stack   = [start]
+    while len(stack) > 0:
+        i, j = stack.pop()
+        for x in ((i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)):
+            if grid[x[0]][x[1]] == ' ' and x not in reached:
+                reached.add(x)
+                stack.append(x)
+    if len(reached) < waypoints + 1:
+        raise ValueError('start of maze (seed {0}) reaches too few cells'.format(seed))
+
+    for i, j in cells:
+        if (i, j) not in reached:
+            grid[i][j] = '%'
+    grid[start[0]][start[1]] = 'P'
+    for i, j in rng.sample(sorted(reached - {start}), waypoints):
+        grid[i][j] = '.'
+    return [''.join(row) for row in grid]
+
+def open_maze(size):
+    """Returns the rows of an open `size` x `size` maze with start and waypoint in opposite corners"""
+    rows = ['%' * size]
+    rows.extend('%' + ' ' * (size - 2) + '%' for _ in range(size - 2))
+    rows.append('%' * size)
+    rows[1]         = '%P' + rows[1][2:]
+    rows[size - 2]  = rows[size - 2][:-2] + '.%'
+    return rows
+
+def write_maze(rows, directory, name):
+    path = os.path.join(directory, name)
+    with open(path, 'w') as file:
+        file.write('\n'.join(rows) + '\n')
+    return path
+
+def run_case(path, mode, timeout, profile = False):
+    """Runs one search on one maze file; runs in its own worker process"""
+    maze    = Maze(path)
+    result  = {'status': 'ok', 'path_length': '', 'states_explored': '', 'python_calls': ''}
+    profiler = cProfile.Profile() if profile else None
+
+    time_start = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            if profiler is not None:
+                profiler.enable()
+            solution    = getattr(search, mode)(maze)
+            time_total  = time.perf_counter() - time_start
+            if profiler is not None:
+                profiler.disable()
+                result['python_calls'] = pstats.Stats(profiler).total_calls
+            error       = maze.validate_path(solution)
+            result.update(status = 'ok' if error is None else 'invalid: ' + error,
+                path_length = len(solution), states_explored = maze.states_explored)
+    except Timeout:
+        time_total  = time.perf_counter() - time_start
+        result['status'] = 'timeout'
+    except Exception as e:
+        time_total  = time.perf_counter() - time_start
+        result['status'] = 'error: {0!r}'.format(e)
+    result['wall_time']     = '{0:.6f}'.format(time_total)
+    result['peak_rss_kb']   = peak_memory_kb()
+    return result
+
+def scaling(sizes, methods, directory):
+    """Prints wall time per cell of single-goal methods on open mazes of each size"""
+    print('{0:>20} {1:>6} {2:>10} {3:>10} {4:>10} {5:>12}'.format(
+        'method', 'size', 'cells', 'explored', 'time (s)', 'us / cell'))
+    for size in sizes:
+        path = write_maze(open_maze(size), directory, 'open_{0}'.format(size))
+        for mode in methods:
+            maze        = Maze(path)
+            maze.compact()
+
+            time_start  = time.perf_counter()
+            solution    = getattr(search, mode)(maze)
+            time_total  = time.perf_counter() - time_start
+
+            assert maze.validate_path(solution) is None
+            print('{0:>20} {1:>6} {2:>10} {3:>10} {4:>10.3f} {5:>12.3f}'.format(
+                mode, size, size * size, maze.states_explored, time_total, 1e6 * time_total / (size * size)))
+
+def suite(arguments, directory):
+    """Runs every (maze, method) case of the random suite and writes the CSV file"""
+    single_goal = dict(METHODS)
+    cases       = []
+    for size, density, waypoints, seed in itertools.product(
+        arguments.sizes, arguments.densities, arguments.waypoints, arguments.seeds):
+        name = 'maze_{0}_{1}_{2}_{3}'.format(size, density, waypoints, seed)
+        path = write_maze(random_maze(size, density, waypoints, seed), directory, name)
+        for mode in arguments.search:
+            if single_goal[mode] and waypoints != 1:
+                continue
+            cases.append(({'size': size, 'density': density, 'waypoints': waypoints, 'seed': seed, 'method': mode}, path))
+
+    # a fresh worker per run, so that peak RSS belongs to that run alone
+    with fresh_worker_pool(arguments.jobs) as executor, open(arguments.output, 'w', newline = '') as file:
+        writer  = csv.DictWriter(file, FIELDS)
+        writer.writeheader()
+        futures = [(case, executor.submit(run_case, path, case['method'], arguments.timeout, arguments.profile)) for case, path in cases]
+        for case, future in futures:
+            row = dict(case, ** future.result())
+            writer.writerow(row)
+            print('{size:>6} {density:>5} {waypoints:>3} {seed:>4} {method:>20} {status:>8} '
+                '{path_length:>6} {states_explored:>9} {wall_time:>10} {peak_rss_kb:>8} {python_calls:>9}'.format( ** row ))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description     = 'CS440 MP1 search benchmark suite',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('--sizes', dest = 'sizes', type = int, nargs = '+', default = [50, 100, 200],
+                        help = 'side lengths of the generated mazes')
+    parser.add_argument('--densities', dest = 'densities', type = float, nargs = '+', default = [0.0, 0.2],
+                        help = 'probability that an interior cell is a wall')
+    parser.add_argument('--waypoints', dest = 'waypoints', type = int, nargs = '+', default = [1, 4],
+                        help = 'number of waypoints per maze')
+    parser.add_argument('--seeds', dest = 'seeds', type = int, nargs = '+', default = [0],
+                        help = 'random seeds')
+    parser.add_argument('--search', dest = 'search', type = str, nargs = '+', default = [name for name, _ in METHODS],
+                        choices = [name for name, _ in METHODS],
+                        help = 'search methods to benchmark')
+    parser.add_argument('--output', dest = 'output', type = str, default = 'benchmark.csv',
+                        help = 'CSV file to write')
+    parser.add_argument('--jobs', dest = 'jobs', type = int, default = 1,
+                        help = 'number of worker processes (0: one per core)')
+    parser.add_argument('--timeout', dest = 'timeout', type = float, default = 60,
+                        help = 'per-run time limit in seconds')
+    parser.add_argument('--profile', dest = 'profile', default = False, action = 'store_true',
+                        help = 'count Python-level function calls of each run with cProfile')
+    parser.add_argument('--keep', dest = 'keep', type = str, default = None,
+                        help = 'directory to keep the generated mazes in')
+    parser.add_argument('--scaling', dest = 'scaling', default = False, action = 'store_true',
+                        help = 'time the single-goal methods on open mazes of each size instead of the random suite')
+
+    arguments   = parser.parse_args()
+    single_goal = dict(METHODS)
+
+    directory   = arguments.keep or tempfile.mkdtemp()
+    os.makedirs(directory, exist_ok = True)
+    try:
+        if arguments.scaling:
+            scaling(arguments.sizes, [mode for mode in arguments.search if single_goal[mode]], directory)
+        else:
+            suite(arguments, directory)
+    finally:
+        if arguments.keep is None:
+            shutil.rmtree(directory, ignore_errors = True)
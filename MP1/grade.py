@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import pprint, argparse, pickle, json
+import pprint, argparse, pickle, json, time, functools
 
 import maze 
+from util import fresh_worker_pool, peak_memory_kb, time_limit, Timeout
 
 # ------------------------------
 # For every part and every map we run the corresponding algorithm
@@ -32,6 +33,14 @@ if __name__ == "__main__":
 
     parser.add_argument('--gradescope', default = False, action = 'store_true',
                         help = 'save output in gradescope-readable json file')
+    parser.add_argument('--no-cache', dest = 'no_cache', default = False, action = 'store_true',
+                        help = 'always re-solve instead of using the on-disk solution cache')
+    parser.add_argument('--jobs', dest = 'jobs', type = int, default = 1,
+                        help = 'grade (maze, method) jobs on this many worker processes (0: one per core, 1: in-process)')
+    parser.add_argument('--timeout', dest = 'timeout', type = float, default = None,
+                        help = 'per-job time limit in seconds when grading with --jobs')
+    parser.add_argument('--compare', default = False, action = 'store_true',
+                        help = 'also run `jps` on the part-2 mazes and compare it against `astar_single`')
 
     arguments   = parser.parse_args()
     
@@ -46,6 +55,8 @@ if __name__ == "__main__":
             print(message)
         raise SystemExit
 
+    import solution_cache
+
 def generate_answer_key(path, mazes, solutions):
     key_instructor  = tuple({case: (getattr(search, solution)(maze), maze.states_explored)
         for case, maze in mazes.items()}
@@ -62,89 +73,173 @@ def load_answer_key(path):
         print('running in student mode (instructor key unavailable)')
         return pickle.load(open(path['student'],    'rb'))
 
+def optimal_items(name, case, answer, length, ret_valid, states_explored, weight = 1):
+    path, key_states = answer
+    score_validity  = int(ret_valid is None)
+    # check that the length of the student’s path matches 
+    true_len = (path if type(path) is int else len(path))
+    if score_validity:
+        score_length    = int(length == true_len)
+        # check that student explores at most 10% more states than solution
+        score_explored = states_explored < 1.1 * key_states
+    else:
+        score_length = 0
+        score_explored = 0
+    return (
+        {
+            'name'      : '{0}: `validate_path(_:)` for \'{1}\' maze'.format(name, case),
+            'output'    : 'Your path is valid' if score_validity else "Your path is not valid, error: {}".format(ret_valid),
+            'score'     : 2 * weight * score_validity,
+            'max_score' : 2 * weight,
+            'visibility': 'visible'
+        },
+        {
+            'name'      : '{0}: not too many states explored for \'{1}\' maze'.format(name, case),
+            'output'    : 'You explored {} states, you should explore fewer than 1.1 * {}'.format(states_explored, key_states),
+            'score'     : weight * score_explored,
+            'max_score' : weight,
+            'visibility': 'visible'
+        },
+        {
+            'name'      : '{0}: correct path length for \'{1}\' maze'.format(name, case),
+            'output'    : 'Your path length is {}, the correct length is {}'.format(length, true_len),
+            'score'     : 2 * weight * score_length,
+            'max_score' : 2 * weight,
+            'visibility': 'visible'
+        },
+    )
+
+def suboptimal_items(name, case, answer, length, ret_valid, states_explored):
+    path, key_states = answer
+    score_validity  = int(ret_valid is None)
+    # check that the path length isn't too bad 
+    sol_len = (path if type(path) is int else len(path))
+    if score_validity:
+        score_length    = ( length  < 1.2 * sol_len )
+        
+        score_explored = states_explored < 1.2 * key_states
+    else:
+        score_length    = 0
+        score_explored = 0
+
+    return (
+        {
+            'name'      : '{0}: `validate_path(_:)` for \'{1}\' maze'.format(name, case),
+            'output'    : 'Your path is valid' if score_validity else "Your path is not valid, error: {}".format(ret_valid),
+            'score'     : 2 * score_validity,
+            'max_score' : 2,
+            'visibility': 'visible'
+        },
+        {
+            'name'      : '{0}: not too many states explored for \'{1}\' maze'.format(name, case),
+            'output'    : 'You explored {} states, you should explore fewer than 1.2 * {}'.format(states_explored, key_states),
+            'score'     : 4 * score_explored,
+            'max_score' : 4,
+            'visibility': 'visible'
+        },
+        {
+            'name'      : '{0}: correct path length for \'{1}\' maze'.format(name, case),
+            'output'    : 'Your path length is {}, it should be less than 1.2 * {}'.format(length, sol_len),
+            'score'     : 4 * score_length,
+            'max_score' : 4,
+            'visibility': 'visible'
+        },
+    )
+
 def grade_optimal(name, key, mazes, solution, weight = 1):
     def grade(case, maze):
-        path, states_explored = key[case]
-        z = getattr(search, solution)(maze)
+        z = solution_cache.solve(maze, solution, use_cache = not arguments.no_cache)
         # check that the path is valid 
         ret_valid = maze.validate_path(z)
-        score_validity  = int(ret_valid is None)
-        # check that the length of the student’s path matches 
-        true_len = (path if type(path) is int else len(path))
-        if score_validity:
-            score_length    = int(len(z) == true_len)
-            # check that student explores at most 10% more states than solution
-            score_explored = maze.states_explored < 1.1 * states_explored
-        else:
-            score_length = 0
-            score_explored = 0
-        return (
-            {
-                'name'      : '{0}: `validate_path(_:)` for \'{1}\' maze'.format(name, case),
-                'output'    : 'Your path is valid' if score_validity else "Your path is not valid, error: {}".format(ret_valid),
-                'score'     : 2 * weight * score_validity,
-                'max_score' : 2 * weight,
-                'visibility': 'visible'
-            },
-            {
-                'name'      : '{0}: not too many states explored for \'{1}\' maze'.format(name, case),
-                'output'    : 'You explored {} states, you should explore fewer than 1.1 * {}'.format(maze.states_explored, states_explored),
-                'score'     : weight * score_explored,
-                'max_score' : weight,
-                'visibility': 'visible'
-            },
-            {
-                'name'      : '{0}: correct path length for \'{1}\' maze'.format(name, case),
-                'output'    : 'Your path length is {}, the correct length is {}'.format(len(z), true_len),
-                'score'     : 2 * weight * score_length,
-                'max_score' : 2 * weight,
-                'visibility': 'visible'
-            },
-        )
+        return optimal_items(name, case, key[case], len(z), ret_valid, maze.states_explored, weight)
             
     return tuple(item for case, maze in mazes.items() for item in grade(case, maze))
 
 def grade_suboptimal(name, key, mazes, solution):
     def grade(case, maze):
-        path, states_explored = key[case]
-        z = getattr(search, solution)(maze)
+        z = solution_cache.solve(maze, solution, use_cache = not arguments.no_cache)
         # check that the path is valid 
         ret_valid = maze.validate_path(z)
-        score_validity  = int(ret_valid is None)
-        # check that the path length isn't too bad 
-        sol_len = (path if type(path) is int else len(path))
-        if score_validity:
-            score_length    = ( len(z)  < 1.2 * sol_len )
+        return suboptimal_items(name, case, key[case], len(z), ret_valid, maze.states_explored)
             
-            score_explored = maze.states_explored < 1.2 * states_explored
-        else:
-            score_length    = 0
-            score_explored = 0
+    return tuple(item for case, maze in mazes.items() for item in grade(case, maze))
+
+def run_job(path, solution, use_cache, timeout):
+    """
+    Solves and validates one maze; runs in a worker process. The timeout is enforced 
+    with SIGALRM where available (not on Windows). Failures are reported through 
+    `valid` so that they are graded like an invalid path.
+    """
+    import search, solution_cache
+
+    result      = {'length': 0, 'valid': None, 'states_explored': 0}
+    time_start  = time.perf_counter()
+    try:
+        with time_limit(timeout):
+            m = maze.Maze(path)
+            z = solution_cache.solve(m, solution, use_cache = use_cache)
+            result.update(length = len(z), valid = m.validate_path(z), states_explored = m.states_explored)
+    except Timeout:
+        result['valid'] = 'timed out after {0} seconds'.format(timeout)
+    except Exception as e:
+        result['valid'] = 'search raised {0!r}'.format(e)
+    result['wall_time']         = time.perf_counter() - time_start
+    result['peak_memory_kb']    = peak_memory_kb()
+    return result
 
+def grade_parallel(parts, jobs, timeout):
+    """
+    Grades every (maze, method) job of `parts` on a process pool and returns the same 
+    items as the sequential graders, in the same order. `parts` holds tuples of 
+    (name, key, mazes, solution, items) where `items` builds the graded entries. Each 
+    job runs in a fresh worker, so its peak memory is its own; the wall time and peak 
+    memory are attached to the job's first entry as `extra_data`.
+    """
+    with fresh_worker_pool(jobs) as executor:
+        futures = [(name, key, case, items, executor.submit(run_job, maze.filepath, solution, not arguments.no_cache, timeout))
+            for name, key, mazes, solution, items in parts
+            for case, maze in mazes.items()]
+
+        results = []
+        for name, key, case, items, future in futures:
+            result  = future.result()
+            entries = items(name, case, key[case], result['length'], result['valid'], result['states_explored'])
+            entries[0]['extra_data'] = {
+                'wall_time'     : result['wall_time'],
+                'peak_memory_kb': result['peak_memory_kb'],
+            }
+            results.extend(entries)
+    return tuple(results)
+
+def compare(name, key, mazes, solution, baseline):
+    # ungraded: checks `solution` for validity/optimality and reports its states explored 
+    # and wall time next to `baseline` on freshly loaded copies of the same mazes
+    def run(maze, method):
+        maze            = type(maze)(maze.filepath)
+        time_start      = time.perf_counter()
+        z               = getattr(search, method)(maze)
+        return maze, z, time.perf_counter() - time_start
+
+    def grade(case, maze):
+        path, states_explored = key[case]
+        true_len = (path if type(path) is int else len(path))
+        maze_base, z_base, time_base = run(maze, baseline)
+        maze_sol,  z_sol,  time_sol  = run(maze, solution)
+        ret_valid = maze_sol.validate_path(z_sol)
         return (
             {
-                'name'      : '{0}: `validate_path(_:)` for \'{1}\' maze'.format(name, case),
-                'output'    : 'Your path is valid' if score_validity else "Your path is not valid, error: {}".format(ret_valid),
-                'score'     : 2 * score_validity,
-                'max_score' : 2,
-                'visibility': 'visible'
-            },
-            {
-                'name'      : '{0}: not too many states explored for \'{1}\' maze'.format(name, case),
-                'output'    : 'You explored {} states, you should explore fewer than 1.2 * {}'.format(maze.states_explored, states_explored),
-                'score'     : 4 * score_explored,
-                'max_score' : 4,
-                'visibility': 'visible'
-            },
-            {
-                'name'      : '{0}: correct path length for \'{1}\' maze'.format(name, case),
-                'output'    : 'Your path length is {}, it should be less than 1.2 * {}'.format(len(z), sol_len),
-                'score'     : 4 * score_length,
-                'max_score' : 4,
+                'name'      : '{0}: `{1}` vs `{2}` for \'{3}\' maze'.format(name, solution, baseline, case),
+                'output'    : '{0}: {1}, length {2} (correct length is {3}), {4} states explored in {5:.4f} seconds; '
+                    '{6}: length {7}, {8} states explored in {9:.4f} seconds'.format(
+                    solution, 'valid' if ret_valid is None else 'not valid, error: {}'.format(ret_valid), 
+                    len(z_sol), true_len, maze_sol.states_explored, time_sol, 
+                    baseline, len(z_base), maze_base.states_explored, time_base),
+                'score'     : 0,
+                'max_score' : 0,
                 'visibility': 'visible'
             },
         )
-            
+
     return tuple(item for case, maze in mazes.items() for item in grade(case, maze))
 
 def main():    
@@ -172,15 +267,21 @@ def main():
     
     #generate_answer_key({'instructor': 'key_i', 'student': 'key_s'}, mazes, solutions)
     key             = load_answer_key({'instructor': 'key_i', 'student': 'key_s'})
-    first_parts    = tuple(item for i, points in zip(range(0, 3), (1, 1, 1))
-        for item in grade_optimal('part-{0}'.format(i + 1), key[i], mazes[i], solutions[i], 
-            weight = points))
+    if arguments.jobs != 1:
+        first_parts = grade_parallel(tuple(
+            ('part-{0}'.format(i + 1), key[i], mazes[i], solutions[i], functools.partial(optimal_items, weight = points))
+            for i, points in zip(range(0, 3), (1, 1, 1))), arguments.jobs, arguments.timeout)
+    else:
+        first_parts    = tuple(item for i, points in zip(range(0, 3), (1, 1, 1))
+            for item in grade_optimal('part-{0}'.format(i + 1), key[i], mazes[i], solutions[i], 
+                weight = points))
+    comparisons     = compare('part-2', key[1], mazes[1], 'jps', 'astar_single') if arguments.compare else ()
     #last_part      = tuple(item for i in range(3, 4) for item in grade_suboptimal('part-{0}'.format(i + 1), key[i], mazes[i], solutions[i]))
     
     # construct grade dictionary for gradescope 
     return {
         'visibility': 'visible', 
-        'tests': first_parts
+        'tests': first_parts + comparisons
         #'tests': first_parts + last_part
     } 
     
@@ -11,15 +11,17 @@
 """
 This file contains the main application that is run for this MP. It
 initializes the pygame context, and handles the interface between the
-game and the search algorithm.
+game and the search algorithm. pygame is imported by the command line
+entry point, only when a display is needed: with --headless it only runs
+the searches and prints one JSON object per maze, without ever importing
+pygame.
 """
 
-import sys, argparse, time
+import sys, argparse, json, time
 
-import pygame
-
-from maze import Maze
+from maze import Maze, MazeError
 import search
+import solution_cache
 
 class gradient:
     def __init__(self, start, end):
@@ -46,6 +48,29 @@ class agent:
         else: 
             return ()
             
+def headless(filepaths, mode, options = None, use_cache = True):
+    """Solves every maze in filepaths and prints one line of JSON per maze"""
+    for filepath in filepaths:
+        try:
+            maze            = Maze(filepath)
+            time_start      = time.perf_counter()
+            path            = solution_cache.solve(maze, mode, options, use_cache)
+            time_total      = time.perf_counter() - time_start
+            result          = {
+                'maze'              : filepath,
+                'search'            : mode,
+                'path_length'       : len(path),
+                'states_explored'   : maze.states_explored,
+                'time'              : time_total,
+                'error'             : maze.validate_path(path),
+            }
+        except (OSError, MazeError, ValueError) as e:
+            result          = {'maze': filepath, 'search': mode, 'error': str(e)}
+        except Exception as e:
+            # a crashing search is reported for its maze and the batch goes on
+            result          = {'maze': filepath, 'search': mode, 'error': '{0}: {1}'.format(type(e).__name__, e)}
+        print(json.dumps(result), flush = True)
+
 class Application:
     def __init__(self, human = True, scale = 20, fps = 30, alt_color = False):
         self.running    = True
@@ -59,7 +84,7 @@ class Application:
         else:
             self.gradient = gradient((255, 0, 0), (0, 255, 0))
 
-    def run(self, filepath, mode, save):
+    def run(self, filepath, mode, save, options = None, use_cache = True):
         self.maze   = Maze(filepath)
         
         self.window = tuple(x * self.scale for x in self.maze.size)
@@ -73,7 +98,7 @@ class Application:
             #time in seconds
             time_start      = time.time()
             
-            path            = getattr(search, mode)(self.maze)
+            path            = solution_cache.solve(self.maze, mode, options, use_cache)
             states_explored = self.maze.states_explored
             
             time_total      = time.time() - time_start   
@@ -179,10 +204,10 @@ if __name__ == "__main__":
         description     = 'CS440 MP1 Search', 
         formatter_class = argparse.ArgumentDefaultsHelpFormatter)
 
-    parser.add_argument('path',
-                        help = 'path to maze file')
+    parser.add_argument('path', nargs = '+',
+                        help = 'path to maze file (several with --headless)')
     parser.add_argument('--search', dest = 'search', type = str, default = 'bfs',
-                        choices = ('bfs', 'astar_corner', 'astar_single', 'fast', 'astar_multiple'), 
+                        choices = ('bfs', 'astar_corner', 'astar_single', 'bidirectional_bfs', 'bidirectional_astar', 'jps', 'fast', 'astar_multiple', 'astar_reduced', 'held_karp'), 
                         help = 'search method')
     parser.add_argument('--scale',  dest = 'scale', type = int, default = 20,
                         help = 'display scale')
@@ -190,14 +215,43 @@ if __name__ == "__main__":
                         help = 'display framerate')
     parser.add_argument('--human', default = False, action = 'store_true',
                         help = 'run in human-playable mode')
+    parser.add_argument('--headless', default = False, action = 'store_true',
+                        help = 'solve without pygame and print one JSON result per maze')
     parser.add_argument('--save', dest = 'save', type = str, default = None,
                         help = 'save output to image file')
+    parser.add_argument('--persist-distances', dest = 'persist_distances', default = False, action = 'store_true',
+                        help = 'save/load the waypoint distance matrix next to the maze file (astar_multiple, fast, astar_reduced, held_karp)')
+    parser.add_argument('--budget', dest = 'budget', type = float, default = None,
+                        help = 'wall-clock budget in seconds for anytime `fast` search (default: single weighted A* pass)')
+    parser.add_argument('--no-cache', dest = 'no_cache', default = False, action = 'store_true',
+                        help = 'always re-solve instead of using the on-disk solution cache')
     parser.add_argument('--altcolor', dest = 'altcolor', default = False, action = 'store_true',
                         help = 'view in an alternate color scheme')
 
     arguments   = parser.parse_args()
+    if arguments.headless and arguments.human:
+        parser.error('--human cannot be combined with --headless')
+    if len(arguments.path) > 1 and not arguments.headless:
+        parser.error('multiple maze files require --headless')
+
+    # extra keyword arguments for the search methods that accept them
+    options     = {}
+    if arguments.persist_distances and arguments.search in ('astar_multiple', 'fast', 'astar_reduced', 'held_karp'):
+        options['persist_distances'] = True
+    if arguments.budget is not None and arguments.search == 'fast':
+        options['budget'] = arguments.budget
+
+    if arguments.headless:
+        headless(arguments.path, arguments.search, options, not arguments.no_cache)
+        raise SystemExit
+
+    # only imported for the display, so that headless runs never load the rendering stack
+    import pygame
+
     application = Application(arguments.human, arguments.scale, arguments.fps, arguments.altcolor)
     application.run(
-        filepath    = arguments.path, 
+        filepath    = arguments.path[0], 
         mode        = arguments.search, 
-        save        = arguments.save)
+        save        = arguments.save,
+        options     = options,
+        use_cache   = not arguments.no_cache)
@@ -8,17 +8,60 @@
 # Created by Kelvin Ma (kelvinm2@illinois.edu) on 01/24/2021, 
 # Inspired by previous work by Michael Abir (abir2@illinois.edu) and Rahul Kunji (rahulsk2@illinois.edu)
 
+from array import array
 from collections import namedtuple
 from itertools import chain 
+import mmap, os
+
+import numpy as np
+
+# files at least this large are loaded through `Maze._load_mapped` by default
+MMAP_THRESHOLD  = 1 << 20
+
+# bytes that `str.strip` removes from the ends of a line
+WHITESPACE      = np.frombuffer(b' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f', dtype = np.uint8)
 
 class MazeError(Exception):
     pass
 
+def read_grid(data):
+    """
+    Returns the rows of the maze file contents `data` (a uint8 array) as a copied 2D 
+    uint8 array, or None if the file is not plain ASCII with rows of one common, 
+    non-zero length (`\n` or `\r\n` line endings, last line ending optional) that do 
+    not start or end with whitespace.
+    """
+    if data.max() > 127:
+        return None
+    ends = np.flatnonzero(data == ord('\n'))
+    if len(ends) == 0 or ends[-1] != len(data) - 1:
+        ends = np.append(ends, len(data))
+    starts  = np.concatenate(([0], ends[:-1] + 1))
+    lengths = ends - starts
+    if (lengths != lengths[0]).any():
+        return None
+
+    width = int(lengths[0])
+    carriage = np.count_nonzero(data == ord('\r'))
+    if carriage > 0:
+        if carriage != len(ends) or (data[ends - 1] != ord('\r')).any():
+            return None
+        width -= 1
+    if width == 0:
+        return None
+
+    grid = data[starts[:, None] + np.arange(width)]
+    if np.isin(grid[:, [0, -1]], WHITESPACE).any():
+        return None
+    return grid
+
 class Maze:
     """
     creates a maze instance given a `path` to a file containing characters in `legend`. 
+    large files are memory-mapped and checked with vectorized scans; `memory_map` forces 
+    (True) or disables (False) this, by default it is used from `MMAP_THRESHOLD` bytes. 
     """
-    def __init__(self, path, legend = {'wall': '%', 'start': 'P', 'waypoint': '.'}):
+    def __init__(self, path, legend = {'wall': '%', 'start': 'P', 'waypoint': '.'}, memory_map = None):
 
         # Passed in legend cannot introduce anything new
         for key in 'wall', 'start', 'waypoint':
@@ -31,6 +74,32 @@ class Maze:
             legend['start'], 
             legend['waypoint'])
         
+        self.filepath   = path
+
+        # uint8 array of the maze characters, kept only when the file was memory-mapped
+        self._grid      = None
+        if memory_map is None:
+            memory_map = os.path.getsize(path) >= MMAP_THRESHOLD
+        if not (memory_map and self._load_mapped(path)):
+            self._load_text(path)
+        
+        # there is no point in making this private since anyone trying to cheat 
+        # could simply overwrite the underscored variable
+        self.states_explored    = 0
+
+        # compact array-backed view of the grid, built on first use by `compact()`
+        self._compact           = None
+
+        # per-maze search structures, built on first use by `search.py` and freed with the maze
+        self._waypoint_distances    = None
+        self._mst_cache             = None
+        self._reduced_graph         = None
+
+        # opt-in instrumentation (see tracing.py); called on every expansion when set
+        self.tracer             = None
+    
+    def _load_text(self, path):
+        """reads the maze line by line and checks it cell by cell"""
         with open(path) as file:
             lines = tuple(line.strip() for line in file.readlines() if line)
         
@@ -72,11 +141,52 @@ class Maze:
         self.waypoints = tuple((i, j) 
             for i in range(self.size.y) 
             for j in range(self.size.x) if self[i, j] == self.legend.waypoint)
-        
-        # there is no point in making this private since anyone trying to cheat 
-        # could simply overwrite the underscored variable
-        self.states_explored    = 0
-    
+
+    def _load_mapped(self, path):
+        """
+        same as `_load_text`, but the file is memory-mapped and all checks are vectorized. 
+        returns False without loading anything for files it would not read exactly like 
+        `_load_text` (non-ASCII bytes, ragged or blank lines, whitespace at either end of a 
+        row, multi-character legend entries), leaving them to the text loader.
+        """
+        if any(len(c) != 1 or ord(c) > 127 for c in self.legend):
+            return False
+        wall, start, waypoint = map(ord, self.legend)
+
+        with open(path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+                data = np.frombuffer(mapped, dtype = np.uint8)
+                grid = read_grid(data)
+                # the map cannot be closed while an array still exports its buffer
+                del data
+        if grid is None:
+            return False
+
+        n, m = grid.shape
+        self._grid      = grid
+        text            = grid.tobytes().decode('ascii')
+        self._storage   = tuple(text[i * m : (i + 1) * m] for i in range(n))
+        self.size       = namedtuple('size', ('x', 'y'))(m, n)
+
+        if not ((grid[0] == wall).all() and (grid[-1] == wall).all() and 
+                (grid[:, 0] == wall).all() and (grid[:, -1] == wall).all()):
+            raise MazeError('(maze \'{0}\'): maze borders must only contain `wall` cells (\'{1}\')'.format(path, self.legend.wall))
+        if n < 3 or m < 3:
+            raise MazeError('(maze \'{0}\'): maze dimensions ({1}, {2}) must be at least (3, 3)'.format(path, n, m))
+
+        # one scan finds both the start and the waypoints, in row-major order
+        found   = np.flatnonzero((grid == start) | (grid == waypoint))
+        kinds   = grid.ravel()[found]
+        starts  = found[kinds == start]
+        if len(starts) != 1:
+            raise MazeError('(maze \'{0}\'): maze must contain exactly one `start` cell (\'{1}\') (found {2})'.format(
+                path, self.legend.start, len(starts)))
+        self.start      = divmod(int(starts[0]), m)
+        self.waypoints  = tuple(divmod(int(x), m) for x in found[kinds == waypoint])
+        return True
+
     def __getitem__(self, index):
         """Access data at index via self[index] instead of using self._storage"""
         i, j = index
@@ -101,6 +211,8 @@ class Maze:
     def neighbors(self, i, j):
         """Returns list of neighboing squares that can be moved to from the given row,col"""
         self.states_explored += 1 
+        if self.tracer is not None:
+            self.tracer.expand(i, j)
         return tuple(x for x in (
             (i + 1, j),
             (i - 1, j),
@@ -108,10 +220,25 @@ class Maze:
             (i, j - 1)) 
             if self.navigable( * x ))
 
+    def compact(self):
+        """Returns the (cached) `CompactGrid` view of this maze"""
+        if self._compact is None:
+            self._compact = CompactGrid(self)
+        return self._compact
+
     def validate_path(self, path):
         # validate type and shape 
         if len(path) == 0:
             return 'path must not be empty'
+        
+        # paths of integer coordinates (the usual case) are checked with array operations
+        try:
+            coords = np.asarray(path)
+        except (ValueError, TypeError):
+            coords = None
+        if coords is not None and coords.ndim == 2 and coords.shape[1] == 2 and coords.dtype.kind in 'iu':
+            return self._validate_coords(coords.astype(np.int64))
+
         if not all(len(vertex) == 2 for vertex in path):
             return 'each path element must be a two-element sequence'
         
@@ -148,3 +275,128 @@ class Maze:
         for i, x in enumerate(self.waypoints):
             if x not in indices:
                 return 'waypoint {0} ({1}, {2}) was never visited'.format(i, * x )
+
+    def passable(self):
+        """Returns a flat boolean array, indexed by cell id `i * size.x + j`, of the non-wall cells"""
+        wall = self.legend.wall
+        if self._grid is not None:
+            return self._grid.ravel() != ord(wall)
+        return np.frombuffer(bytearray(c != wall for line in self._storage for c in line), dtype = np.bool_)
+
+    def _validate_coords(self, coords):
+        """`validate_path` for an (n, 2) integer array, with the same checks and messages"""
+        rows, cols  = coords[:, 0], coords[:, 1]
+
+        # check if path is contiguous
+        steps = np.abs(np.diff(coords, axis = 0)).sum(axis = 1)
+        bad = np.flatnonzero(steps != 1)
+        if len(bad) > 0:
+            i = int(bad[0])
+            return 'path vertex {1} ({4}, {5}) must be exactly one move away from path vertex {0} ({2}, {3})'.format(
+                i, i + 1, * coords[i].tolist() , * coords[i + 1].tolist() )
+
+        # check if path is navigable 
+        inside  = (rows >= 0) & (rows < self.size.y) & (cols >= 0) & (cols < self.size.x)
+        ids     = np.where(inside, rows * self.size.x + cols, 0)
+        # only the passability mask: the full `CompactGrid` is left to the searches
+        passable = self.passable()
+        bad = np.flatnonzero(~inside | ~passable[ids])
+        if len(bad) > 0:
+            i = int(bad[0])
+            return 'path vertex {0} ({1}, {2}) is not a navigable maze cell'.format(i, * coords[i].tolist() )
+
+        # check if path ends at a waypoint 
+        waypoints   = np.array([i * self.size.x + j for i, j in self.waypoints], dtype = np.int64)
+        is_waypoint = np.isin(ids, waypoints)
+        if not is_waypoint[-1]:
+            return 'last path vertex {0} ({1}, {2}) must be a waypoint'.format(len(coords) - 1, * coords[-1].tolist() )
+
+        # check for unnecessary path segments: a revisited cell needs a waypoint somewhere 
+        # in [previous visit, revisit), counted with a prefix sum over the path
+        order   = np.argsort(ids, kind = 'stable')
+        prev    = np.full(len(ids), -1, dtype = np.int64)
+        repeat  = ids[order[1:]] == ids[order[:-1]]
+        prev[order[1:][repeat]] = order[:-1][repeat]
+        counts  = np.concatenate(([0], np.cumsum(is_waypoint)))
+        bad = np.flatnonzero((prev >= 0) & (counts[np.arange(len(ids))] == counts[np.maximum(prev, 0)]))
+        if len(bad) > 0:
+            i = int(bad[0])
+            return 'path segment [{0} : {1}] contains no waypoints'.format(int(prev[i]), i)
+
+        # check if path contains all waypoints 
+        bad = np.flatnonzero(~np.isin(waypoints, ids))
+        if len(bad) > 0:
+            i = int(bad[0])
+            return 'waypoint {0} ({1}, {2}) was never visited'.format(i, * self.waypoints[i] )
+
+class CompactGrid:
+    """
+    array-backed view of a `Maze`. cells are addressed by the integer id `i * width + j`, 
+    passability is a flat `bytearray`, and adjacency is precomputed in CSR form 
+    (`offsets`, `targets`) so that searches can run entirely on ints and only convert 
+    back to `(row, col)` tuples at the end. 
+    """
+    def __init__(self, maze):
+        self.maze       = maze 
+        self.width      = maze.size.x
+        self.height     = maze.size.y
+
+        passable        = maze.passable()
+        self.passable   = bytearray(passable.tobytes())
+
+        # neighbors are listed in the same order as `Maze.neighbors` so that searches 
+        # break ties (and therefore count explored states) exactly as before
+        # int32 (intc) ids, the range of the `array('i')` offsets and targets they end up in
+        w, h            = self.width, self.height
+        ids             = np.arange(w * h, dtype = np.intc)
+        i, j            = np.divmod(ids, w)
+        moves           = np.stack((ids + w, ids - w, ids + 1, ids - 1), axis = 1)
+        valid           = np.stack((i + 1 < h, i > 0, j + 1 < w, j > 0), axis = 1)
+        valid[valid]    = passable[moves[valid]]
+
+        # rows of `moves` are cells, so masking keeps each cell's targets together, in order
+        offsets         = np.zeros(w * h + 1, dtype = np.intc)
+        np.cumsum(valid.sum(axis = 1), out = offsets[1:])
+        self.offsets    = array('i', offsets.tobytes())
+        self.targets    = array('i', moves[valid].tobytes())
+
+        self.start      = self.cell_id( * maze.start )
+        self.waypoints  = tuple(self.cell_id( * x ) for x in maze.waypoints)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def cell_id(self, i, j):
+        """Returns the integer id of cell (i, j)"""
+        return i * self.width + j
+
+    def cell(self, x):
+        """Returns the (row, col) tuple of cell id x"""
+        return divmod(x, self.width)
+
+    def path(self, ids):
+        """Converts a sequence of cell ids into a list of (row, col) tuples"""
+        w = self.width
+        return [divmod(x, w) for x in ids]
+
+    def navigable(self, x):
+        """Check if cell id x is a valid move"""
+        return 0 <= x < len(self.passable) and self.passable[x] == 1
+
+    def expand(self, x, state = None):
+        """Counts cell id x as explored (for searches that generate successors themselves)"""
+        self.maze.states_explored += 1
+        if self.maze.tracer is not None:
+            self.maze.tracer.expand( * divmod(x, self.width), state)
+
+    def neighbors(self, x, state = None):
+        """
+        Returns the ids of cells that can be moved to from cell id x, counting it as explored. 
+        Searches over more than cells pass `state`, a hashable id of the expanded search state, 
+        for the tracer.
+        """
+        maze = self.maze
+        maze.states_explored += 1
+        if maze.tracer is not None:
+            maze.tracer.expand( * divmod(x, self.width), state)
+        return self.targets[self.offsets[x] : self.offsets[x + 1]]
@@ -22,17 +22,21 @@ files and classes when code is run, so be careful to not modify anything else.
 # Feel free to use the code below as you wish
 # Initialize it with a list/tuple of objectives
 # Call compute_mst_weight to get the weight of the MST with those objectives
-# TODO: hint, you probably want to cache the MST value for sets of objectives you've already computed...
-from collections import deque
+# MSTCache below caches the MST value for sets of objectives you've already computed
+from array import array
+from collections import deque, namedtuple, OrderedDict
+import hashlib
 import heapq
 import math
-from copy import deepcopy
+import os
+import numpy as np
 import time
 from typing import final
 
 class MST:
-    def __init__(self, objectives):
+    def __init__(self, objectives, distance = None):
         self.elements = {key: None for key in objectives}
+        self.distance = distance
 
         # TODO: implement some distance between two objectives 
         # ... either compute the shortest path between them, or just use the manhattan distance between the objectives
@@ -80,8 +84,150 @@ class MST:
         return (x for y in (((i, j) for j in keys if i < j) for i in keys) for x in y)
 
     def DISTANCE(self, obj_a, obj_b):
+        if self.distance is not None:
+            return self.distance(obj_a, obj_b)
         return manhattan(obj_a, obj_b)
 
+CacheInfo = namedtuple('CacheInfo', ('hits', 'misses', 'maxsize', 'currsize'))
+
+class MSTCache:
+    """
+    LRU cache of MST weights keyed by the bitmask of remaining objectives. objectives are 
+    indexed once (bit i <-> objectives[i]), so every subset has a single immutable int key 
+    and a subset seen again anywhere in the search is only computed once.
+    """
+    def __init__(self, objectives, distance = None, maxsize = 1 << 16):
+        self.objectives = tuple(objectives)
+        self.distance   = distance
+        self.bits       = {obj: 1 << i for i, obj in enumerate(self.objectives)}
+        self.full       = (1 << len(self.objectives)) - 1
+        self.maxsize    = maxsize
+        self.weights    = OrderedDict()
+        self.hits       = 0
+        self.misses     = 0
+
+    def mask(self, objectives):
+        # bitmask of a collection of objectives
+        mask = 0
+        for obj in objectives:
+            mask |= self.bits[obj]
+        return mask
+
+    def weight(self, mask):
+        # MST weight of the objectives in mask, evicting the least recently used entry when full
+        if mask in self.weights:
+            self.hits += 1
+            self.weights.move_to_end(mask)
+            return self.weights[mask]
+
+        self.misses += 1
+        weight = MST([obj for i, obj in enumerate(self.objectives) if mask >> i & 1], 
+            self.distance).compute_mst_weight()
+        self.weights[mask] = weight
+        if len(self.weights) > self.maxsize:
+            self.weights.popitem(last = False)
+        return weight
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.weights))
+
+# one MSTCache per maze, shared by every search run on it
+def mst_cache(maze, persist_distances = False):
+    dist = waypoint_distances(maze, persist_distances)
+    if maze._mst_cache is None:
+        maze._mst_cache = MSTCache(maze.waypoints, dist.between)
+    return maze._mst_cache
+
+# distance used for cells that cannot reach a waypoint
+UNREACHABLE = np.iinfo(np.int32).max
+
+class WaypointDistances:
+    """
+    true maze distances for the multi-goal heuristic. one BFS per waypoint (plus the start) 
+    over the compact grid gives `fields[i, x]`, the distance from source i to cell id x; 
+    `matrix` is the all-pairs shortest-path matrix between the sources. sources are the 
+    waypoints in maze order followed by the start.
+
+    with `persist` the arrays are saved next to the maze file (`<maze>.dist.npz`) together 
+    with a digest of the maze, so repeated runs on an unchanged maze skip the BFS stage.
+    """
+    def __init__(self, maze, persist = False):
+        # only the adjacency arrays are kept, not the grid, so that no reference leads back 
+        # to the maze that caches this object
+        grid            = maze.compact()
+        self.width      = grid.width
+        self.size       = len(grid)
+        self.offsets    = grid.offsets
+        self.targets    = grid.targets
+        self.sources    = tuple(maze.waypoints) + (maze.start,)
+        self.index      = {cell: i for i, cell in enumerate(self.sources)}
+        self.persisted  = False
+
+        self.fields = None
+        if persist:
+            self.fields = self.load(maze)
+        if self.fields is None:
+            self.fields = np.stack([self.bfs_field(grid.cell_id( * x )) for x in self.sources])
+            if persist:
+                self.save(maze)
+        self.matrix     = self.fields[:, [grid.cell_id( * x ) for x in self.sources]]
+
+        # plain lists make the per-state lookups in the heuristic cheap
+        self.rows       = self.fields.tolist()
+        self.pairs      = self.matrix.tolist()
+
+    @staticmethod
+    def digest(maze):
+        #the maze digest is only needed to validate or write `.dist.npz`
+        with open(maze.filepath, 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+    def load(self, maze):
+        # fields stored next to the maze file, or None if missing or stale
+        cache = maze.filepath + '.dist.npz'
+        if not os.path.exists(cache):
+            return None
+        with np.load(cache) as data:
+            if str(data['digest']) != self.digest(maze) or data['fields'].shape != (len(self.sources), self.size):
+                return None
+            self.persisted = True
+            return data['fields']
+
+    def save(self, maze):
+        np.savez(maze.filepath + '.dist.npz', digest = self.digest(maze), fields = self.fields)
+        self.persisted = True
+
+    def bfs_field(self, source):
+        # distances from cell id source to every cell; not counted as explored states
+        offsets, targets = self.offsets, self.targets
+        dist = array('i', [UNREACHABLE]) * self.size
+        dist[source] = 0
+        q = deque((source,))
+        while len(q) > 0:
+            curr = q.popleft()
+            d = dist[curr] + 1
+            for n in targets[offsets[curr] : offsets[curr + 1]]:
+                if dist[n] == UNREACHABLE:
+                    dist[n] = d
+                    q.append(n)
+        return np.frombuffer(dist, dtype = np.int32)
+
+    def between(self, a, b):
+        # shortest-path distance between two sources (waypoints or the start)
+        return self.pairs[self.index[a]][self.index[b]]
+
+    def to(self, source, cell):
+        # shortest-path distance from a source to any (row, col) cell
+        return self.rows[self.index[source]][cell[0] * self.width + cell[1]]
+
+def waypoint_distances(maze, persist = False):
+    # cached on the maze, like its compact grid, so it is freed together with the maze
+    if maze._waypoint_distances is None:
+        maze._waypoint_distances = WaypointDistances(maze, persist)
+    elif persist and not maze._waypoint_distances.persisted:
+        maze._waypoint_distances.save(maze)
+    return maze._waypoint_distances
+
 def bfs(maze):
     """
     Runs BFS for part 1 of the assignment.
@@ -91,39 +237,43 @@ def bfs(maze):
     @return path: a list of tuples containing the coordinates of each state in the computed path
     """
 
-    points_to_visit = list(maze.waypoints)
-    q = []
-    q.append(maze.start)
-    visited = []
-    visited.append(maze.start)
+    #run on the compact cell-id grid: deque frontier, bytearray visited index, 
+    #parent pointers in a flat int array
+    grid = maze.compact()
+    points_to_visit = set(grid.waypoints)
+    q = deque()
+    q.append(grid.start)
+    visited = bytearray(len(grid))
+    visited[grid.start] = 1
 
-    last_waypoint = points_to_visit[0]
-    parent = {}
+    last_waypoint = grid.waypoints[0]
+    parent = array('i', [-1]) * len(grid)
 
     #BFS
     while (len(q) > 0):
-        curr = q.pop(0)
-        # print(str(curr[0]) + "," + str(curr[1]))
+        curr = q.popleft()
 
-        if curr in points_to_visit:
-            points_to_visit.remove(curr)
+        points_to_visit.discard(curr)
         if len(points_to_visit) == 0:
             last_waypoint = curr
             break
 
-        for n in maze.neighbors(curr[0], curr[1]):
-            if n not in visited:
+        for n in grid.neighbors(curr):
+            if not visited[n]:
                 parent[n] = curr
                 q.append(n)
-                visited.append(n)
+                visited[n] = 1
     
-    #get path from parent
-    path = [last_waypoint]
-    while path[-1] != maze.start:
+    return trace_path(grid, parent, last_waypoint)
+
+def trace_path(grid, parent, last):
+    #get path from parent pointers (cell ids), converting back to (row, col) tuples at the end
+    path = [last]
+    while path[-1] != grid.start:
         path.append(parent[path[-1]])
     path.reverse()
 
-    return path
+    return grid.path(path)
 
 def manhattan(a, b):
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -145,113 +295,300 @@ def astar_single(maze):
     #need f(x) = g(x) + h(x), where g(x) = actual distance from x to start
     #and h(x) = estimated distance from x to end
 
-    points_to_visit = list(maze.waypoints)
+    grid = maze.compact()
+    points_to_visit = list(grid.waypoints)
+    goal = grid.cell(points_to_visit[0])
     h = [] #heapq
 
-    #heapq keeps track of cost estimate to goal, cell, # steps taken t0 reach that cell
-    #cost estimate is first so heapq works 
-    start_state = (astar_single_cost(maze.start, 0, points_to_visit[0]), maze.start, 0)
+    #heapq keeps track of cost estimate to goal, cell id, # steps taken t0 reach that cell
+    #cost estimate is first so heapq works. cell ids order the same way as (row, col) 
+    #tuples, so ties are broken exactly as before
+    start_state = (astar_single_cost(maze.start, 0, goal), grid.start, 0)
 
     heapq.heappush(h, start_state)
 
-    visited = []
-    visited.append(maze.start)
+    visited = bytearray(len(grid))
+    visited[grid.start] = 1
 
     last_waypoint = points_to_visit[0]
-    parent = {}
+    parent = array('i', [-1]) * len(grid)
 
     #AStar
     while (len(h) > 0):
-        curr = heapq.heappop(h)
-        curr_cell = curr[1]
-        curr_cost = curr[2]
-        # print(str(curr[0]) + ", " + str(curr[1]) + ", " + str(curr[2]))
+        curr_cost_estimate, curr_cell, curr_cost = heapq.heappop(h)
 
         if curr_cell in points_to_visit:
             points_to_visit.remove(curr_cell)
+            if len(points_to_visit) > 0:
+                goal = grid.cell(points_to_visit[0])
         if len(points_to_visit) == 0:
             last_waypoint = curr_cell
             break
 
-        for n in maze.neighbors(curr_cell[0], curr_cell[1]):
-            if n not in visited:
-                # print("neighbor: " + str(n))
+        for n in grid.neighbors(curr_cell):
+            if not visited[n]:
                 parent[n] = curr_cell
-                # cost_estimate = (astar_cost(curr_cost, curr_cell, points_to_visit[0]), n)
-                cost_estimate = astar_single_cost(n, curr_cost + 1, points_to_visit[0])
-                # print("cost: " + str(cost_estimate))
+                cost_estimate = astar_single_cost(grid.cell(n), curr_cost + 1, goal)
                 heapq.heappush(h, (cost_estimate, n, curr_cost + 1))
-                visited.append(n)
+                visited[n] = 1
 
-    #get path from parent
-    path = [last_waypoint]
-    while path[-1] != maze.start:
-        path.append(parent[path[-1]])
+    return trace_path(grid, parent, last_waypoint)
+
+def single_goal(grid, method):
+    if len(grid.waypoints) != 1:
+        raise ValueError('{0} needs a maze with exactly one waypoint (found {1})'.format(method, len(grid.waypoints)))
+    return grid.waypoints[0]
+
+def join_paths(grid, parent_f, parent_b, meet):
+    #forward half is traced back from the meeting cell to the start, backward half forward to the goal
+    path = [meet]
+    while parent_f[path[-1]] >= 0:
+        path.append(parent_f[path[-1]])
     path.reverse()
+    while parent_b[path[-1]] >= 0:
+        path.append(parent_b[path[-1]])
+    return grid.path(path)
+
+def bidirectional_bfs(maze):
+    """
+    Runs BFS from the start and from the (single) waypoint at the same time, always 
+    growing the smaller frontier by one full layer, and stops after the first layer in 
+    which the two searches meet.
+
+    @param maze: The maze to execute the search on.
+
+    @return path: a list of tuples containing the coordinates of each state in the computed path
+    """
+
+    grid = maze.compact()
+    goal = single_goal(grid, 'bidirectional_bfs')
+    if grid.start == goal:
+        return grid.path([goal])
+
+    dist = (array('i', [UNREACHABLE]) * len(grid), array('i', [UNREACHABLE]) * len(grid))
+    parent = (array('i', [-1]) * len(grid), array('i', [-1]) * len(grid))
+    frontier = [[grid.start], [goal]]
+    dist[0][grid.start] = 0
+    dist[1][goal] = 0
+
+    best, meet = UNREACHABLE, -1
+    while len(frontier[0]) > 0 and len(frontier[1]) > 0 and meet < 0:
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        d, other, par = dist[side], dist[1 - side], parent[side]
+
+        #expand a whole layer so that every meeting point at this depth is compared
+        layer = []
+        for curr in frontier[side]:
+            for n in grid.neighbors(curr):
+                if d[n] == UNREACHABLE:
+                    d[n] = d[curr] + 1
+                    par[n] = curr
+                    layer.append(n)
+                    if other[n] != UNREACHABLE and d[n] + other[n] < best:
+                        best, meet = d[n] + other[n], n
+        frontier[side] = layer
+
+    return join_paths(grid, parent[0], parent[1], meet)
+
+def bidirectional_astar(maze):
+    """
+    Runs A* from the start towards the (single) waypoint and from the waypoint back 
+    towards the start, expanding from the side with the smaller open list. Each side 
+    uses the manhattan distance to the other end, and the search stops once the best 
+    meeting cost found is no larger than the smallest f on either open list.
+
+    @param maze: The maze to execute the search on.
+
+    @return path: a list of tuples containing the coordinates of each state in the computed path
+    """
+
+    grid = maze.compact()
+    goal = single_goal(grid, 'bidirectional_astar')
+    if grid.start == goal:
+        return grid.path([goal])
+
+    ends = (grid.cell(goal), maze.start)
+    steps = (array('i', [UNREACHABLE]) * len(grid), array('i', [UNREACHABLE]) * len(grid))
+    parent = (array('i', [-1]) * len(grid), array('i', [-1]) * len(grid))
+    h = ([], [])
+    steps[0][grid.start] = 0
+    steps[1][goal] = 0
+    heapq.heappush(h[0], (astar_single_cost(maze.start, 0, ends[0]), grid.start, 0))
+    heapq.heappush(h[1], (astar_single_cost(ends[0], 0, ends[1]), goal, 0))
+
+    best, meet = UNREACHABLE, -1
+    while len(h[0]) > 0 and len(h[1]) > 0:
+        if best <= max(h[0][0][0], h[1][0][0]):
+            break
 
-    return path
+        side = 0 if len(h[0]) <= len(h[1]) else 1
+        g, other, par, end = steps[side], steps[1 - side], parent[side], ends[side]
+
+        curr_cost_estimate, curr_cell, curr_cost = heapq.heappop(h[side])
+        if curr_cost != g[curr_cell]:
+            #stale entry
+            continue
+
+        for n in grid.neighbors(curr_cell):
+            if curr_cost + 1 < g[n]:
+                g[n] = curr_cost + 1
+                par[n] = curr_cell
+                heapq.heappush(h[side], (astar_single_cost(grid.cell(n), curr_cost + 1, end), n, curr_cost + 1))
+                if other[n] != UNREACHABLE and g[n] + other[n] < best:
+                    best, meet = g[n] + other[n], n
+
+    return join_paths(grid, parent[0], parent[1], meet)
+
+def jps(maze):
+    """
+    Runs Jump Point Search (4-connected variant) from the start to the (single) waypoint. 
+    Straight runs are scanned over the compact grid's passability mask without being 
+    expanded; only jump points (cells with a forced neighbor, cells from which a 
+    horizontal jump finds one while moving vertically, and the goal) are pushed, and 
+    each expanded jump point counts as one explored state.
+
+    @param maze: The maze to execute the search on.
+
+    @return path: a list of tuples containing the coordinates of each state in the computed path
+    """
+
+    grid = maze.compact()
+    goal = single_goal(grid, 'jps')
+    goal_cell = grid.cell(goal)
+    passable, w = grid.passable, grid.width
+
+    def jump_horizontal(cell, dj):
+        while passable[cell]:
+            if cell == goal:
+                return cell
+            #forced neighbor: above or below opens up right after a wall
+            if (passable[cell - w] and not passable[cell - w - dj]) or \
+               (passable[cell + w] and not passable[cell + w - dj]):
+                return cell
+            cell += dj
+        return -1
+
+    def jump_vertical(cell, di):
+        step = di * w
+        while passable[cell]:
+            if cell == goal:
+                return cell
+            if (passable[cell - 1] and not passable[cell - 1 - step]) or \
+               (passable[cell + 1] and not passable[cell + 1 - step]):
+                return cell
+            #moving vertically, a horizontal jump point makes this cell a jump point too
+            if jump_horizontal(cell + 1, 1) >= 0 or jump_horizontal(cell - 1, -1) >= 0:
+                return cell
+            cell += step
+        return -1
+
+    def successors(cell, prev):
+        #prune the neighbors that a path through prev could reach at least as cheaply
+        if prev < 0:
+            directions = ((1, 0), (-1, 0), (0, 1), (0, -1))
+        else:
+            i, j = grid.cell(cell)
+            pi, pj = grid.cell(prev)
+            di, dj = (i > pi) - (i < pi), (j > pj) - (j < pj)
+            if dj != 0:
+                directions = ((-1, 0), (1, 0), (0, dj))
+            else:
+                directions = ((0, -1), (0, 1), (di, 0))
+        for di, dj in directions:
+            n = cell + di * w + dj
+            if passable[n]:
+                x = jump_horizontal(n, dj) if dj != 0 else jump_vertical(n, di)
+                if x >= 0:
+                    yield x
+
+    steps = {grid.start: 0}
+    parent = {grid.start: -1}
+    h = [(astar_single_cost(maze.start, 0, goal_cell), grid.start, 0)]
+
+    while len(h) > 0:
+        curr_cost_estimate, curr_cell, curr_cost = heapq.heappop(h)
+        if curr_cost != steps[curr_cell]:
+            continue
+        if curr_cell == goal:
+            break
+
+        grid.expand(curr_cell)
+        ci, cj = grid.cell(curr_cell)
+        for n in successors(curr_cell, parent[curr_cell]):
+            ni, nj = grid.cell(n)
+            cost = curr_cost + abs(ni - ci) + abs(nj - cj)
+            if cost < steps.get(n, UNREACHABLE):
+                steps[n] = cost
+                parent[n] = curr_cell
+                heapq.heappush(h, (astar_single_cost((ni, nj), cost, goal_cell), n, cost))
+
+    #expand the straight segments between consecutive jump points back into cells
+    jump_points = [goal]
+    while parent[jump_points[-1]] >= 0:
+        jump_points.append(parent[jump_points[-1]])
+    jump_points.reverse()
+
+    path = [grid.start]
+    for a, b in zip(jump_points, jump_points[1:]):
+        step = w if abs(b - a) >= w else 1
+        step = step if b > a else -step
+        path.extend(range(a + step, b + step, step))
+    return grid.path(path)
 
 class State:
-    def __init__(self, cell, prev, to_visit, steps, mst_weight, visited, h_weight):
+    """
+    compact search node: cell id, bitmask of waypoints still to visit, steps taken (g), 
+    priority (f), and the pool index of the node itself and of its parent. nodes live in 
+    a flat list (the node pool) and refer to each other by index, so no per-state dicts 
+    are ever copied. the open list holds (f, pool index) tuples, so the heap compares 
+    plain ints instead of calling back into python for every comparison.
+    """
+    __slots__ = ('cell', 'mask', 'steps', 'weight', 'index', 'prev')
+
+    def __init__(self, cell, mask, steps, weight, index, prev):
         self.cell = cell
-        self.prev = prev
-        self.to_visit = to_visit
+        self.mask = mask
         self.steps = steps
-        self.mst_weight = mst_weight
-        self.visited = visited
-        self.h_weight = h_weight
-
-        self.weight = heuristic(self) + self.steps
-
-    def __lt__(self, other):
-        # return self.weight <= other.weight
-        return self.weight < other.weight
-
-    def __eq__(self, other):
-        if other == None:
-            return False
-        # return self.cell == other.cell and self.to_visit == other.to_visit and self.weight == other.weight
-        return self.cell == other.cell and self.to_visit == other.to_visit
-
-    def __hash__(self):
-        # return hash((self.cell, tuple(self.to_visit.keys()), self.weight))
-        return hash((self.cell, tuple(self.to_visit.keys())))
-
-def nearest_waypoint(state):
-    if len(state.to_visit) == 0:
-        return None
-
-    # min_point = state.to_visit[0]
-    min_point = list(state.to_visit.keys())[0]
-    min_dist = manhattan(state.cell, min_point)
-
-    for point in state.to_visit:
-        if manhattan(state.cell, point) < min_dist:
-            min_point = point
-            min_dist = manhattan(state.cell, point)
+        self.weight = weight
+        self.index = index
+        self.prev = prev
+
+def waypoint_bits(grid):
+    #bit of the waypoint at each cell id (0 elsewhere), as a list for call-free lookups
+    bit = [0] * len(grid)
+    for i, cell in enumerate(grid.waypoints):
+        bit[cell] |= 1 << i
+    return bit
+
+def nearest_waypoint(dist, cell, mask):
+    #waypoint (bit index) in mask nearest to cell id by true maze distance, and that distance
+    if mask == 0:
+        return None, 0
+
+    min_point, min_dist = None, UNREACHABLE
+    rows = dist.rows
+    i = 0
+    while mask >> i:
+        if mask >> i & 1 and rows[i][cell] < min_dist:
+            min_point, min_dist = i, rows[i][cell]
+        i += 1
     
-    return min_point
+    return min_point, min_dist
 
-def heuristic(state):
-    nearest = nearest_waypoint(state)
+def heuristic(dist, mst, cell, mask):
+    nearest, nearest_dist = nearest_waypoint(dist, cell, mask)
     if nearest == None: return 0
-    # return manhattan(nearest, state.cell)
-    return (manhattan(nearest, state.cell) + state.mst_weight) * state.h_weight
-    # return 0
-
-def backtrack(start_state, final_state):
-    # print("start: " + str(start_state.cell) + ", end: " + str(final_state.cell))
+    return nearest_dist + mst.weight(mask)
 
+def backtrack(grid, pool, final_state):
     path = []
     curr = final_state
-    while curr != start_state:
-        # print(curr.cell)
+    while curr is not None:
         path.append(curr.cell)
-        curr = curr.prev
+        curr = pool[curr.prev] if curr.prev >= 0 else None
     
-    path.append(start_state.cell)
     path.reverse()
-    return path 
+    return grid.path(path)
     
 """
 current issue: runtime too long on larger mazes
@@ -277,60 +614,66 @@ working on 1 and 2. Corner: forgot lol, Autograder: 85?
 
 """
 
-def astar_multiple(maze):
-    h, path = [], []
-    visited_states = {}
+def astar_multiple(maze, persist_distances = False):
+    return multi_astar(maze, 1, persist_distances)
 
-    start_mst = MST(list(maze.waypoints))
-    start_to_visit = {}
-    for cell in maze.waypoints:
-        start_to_visit[cell] = True
+def multi_astar(maze, h_weight, persist_distances = False):
+    """
+    A* over (cell id, remaining-waypoint bitmask) states with f = g + h_weight * h. 
+    h is the distance to the nearest remaining waypoint plus the MST weight of the 
+    remaining waypoints, both in true maze distance. It is admissible but not 
+    consistent, so a state can be reached with fewer steps after it was expanded: 
+    best_steps keeps the shortest route to each state, entries pushed before a shorter 
+    route was found are skipped as stale, and improved states are pushed (re-opened) 
+    again. With h_weight = 1 the first goal state popped is therefore optimal.
+    """
+    grid = maze.compact()
+    mst = mst_cache(maze, persist_distances)
+    dist = waypoint_distances(maze, persist_distances)
+    bit = waypoint_bits(grid)
+
+    #best known steps and memoized h for each (cell, mask) state, keyed by a single int
+    shift = len(grid).bit_length()
+    best_steps, hvalue = {}, {}
+
+    start_mask = mst.full & ~bit[grid.start]
+    start_key = start_mask << shift | grid.start
+    hvalue[start_key] = heuristic(dist, mst, grid.start, start_mask)
+    start_state = State(grid.start, start_mask, 0, h_weight * hvalue[start_key], 0, -1)
+    pool = [start_state]
+    #open list entries are (f, -g, pool index): ties go to the deeper state, then to the older one
+    opened = [(start_state.weight, 0, 0)]
+    best_steps[start_key] = 0
 
-    start_state = State(maze.start, None, start_to_visit, 1, start_mst.compute_mst_weight(), {maze.start: True}, 1)
+    final_state = start_state
 
-    heapq.heappush(h, start_state)
-    visited_states[start_state] = True
+    while len(opened) > 0:
+        curr = pool[heapq.heappop(opened)[2]]
+        if curr.steps != best_steps[curr.mask << shift | curr.cell]:
+            #stale entry, a shorter route to this state was pushed later
+            continue
 
-    final_state = start_state
+        if curr.mask == 0:
+            final_state = curr
+            break
 
-    while len(h) > 0:
-        curr = heapq.heappop(h)
-        visited_states[curr] = True
-
-        if curr.cell in curr.to_visit:
-            curr.to_visit = deepcopy(curr.to_visit)
-            del curr.to_visit[curr.cell]
-
-            if len(curr.to_visit) == 0:
-                final_state = curr
-                break
-            
-            temp_mst = MST(curr.to_visit.keys())
-            curr.mst_weight = temp_mst.compute_mst_weight()
-            curr.weight = heuristic(curr) + curr.steps
-
-            curr.visited.clear()
-            # curr.visited[curr.cell] = True
-
-        for n in maze.neighbors(curr.cell[0], curr.cell[1]):
-            #deepcopy is slow. Don't call unless necessary
-            # temp = State(n, curr, curr.to_visit, curr.steps + 1, curr.mst_weight, {}, 1)
-            temp = State(n, curr, curr.to_visit, curr.steps + 1, curr.mst_weight, curr.visited, 1)
-
-            if temp not in visited_states:
-                if n not in temp.visited:
-                    temp.visited = deepcopy(curr.visited)
-                    temp.visited[n] = True
-                    visited_states[temp] = True
-                    # print("cell: " + str(temp.cell) + ", mst_weights: " + str(temp.mst_weight) + ", weight: " + str(temp.weight))
-                    # print("cell: " + str(temp.cell) + ", path length: " + str(temp.steps))
-                    # print
-                    heapq.heappush(h, temp)
-
-    print(final_state.cell)
-    return backtrack(start_state, final_state)
-
-def fast(maze):
+        steps = curr.steps + 1
+        for n in grid.neighbors(curr.cell, curr.mask << shift | curr.cell):
+            mask = curr.mask & ~bit[n]
+            key = mask << shift | n
+            if key not in best_steps or steps < best_steps[key]:
+                #h is only evaluated for states that are actually pushed, once per state
+                best_steps[key] = steps
+                if key not in hvalue:
+                    hvalue[key] = heuristic(dist, mst, n, mask)
+                weight = steps + h_weight * hvalue[key]
+                index = len(pool)
+                pool.append(State(n, mask, steps, weight, index, curr.index))
+                heapq.heappush(opened, (weight, -steps, index))
+
+    return backtrack(grid, pool, final_state)
+
+def fast(maze, persist_distances = False, budget = None):
     # """
     # Runs suboptimal search algorithm for part 4.
 
@@ -362,65 +705,288 @@ def fast(maze):
     2.5,    555, 7779,     1
 
     500 is not good enough? path length is 1 so we didn't finish in time
+
+    with a time budget (seconds) the search runs anytime instead: see anytime_astar
     """
 
-    return fast_helper(maze, 2.5)
+    if budget is not None:
+        return anytime_astar(maze, budget, persist_distances = persist_distances)
+    return fast_helper(maze, 2.5, persist_distances)
 
 
-def fast_helper(maze, weight):
-    # # use weighted A* search. 
-    # # tested weights: 
+def fast_helper(maze, weight, persist_distances = False):
+    # use weighted A* search. 
+    return multi_astar(maze, weight, persist_distances)
 
-    h, path = [], []
-    visited_states = {}
+def anytime_astar(maze, budget, start_weight = 2.5, weight_step = 0.25, persist_distances = False):
+    """
+    ARA*-style anytime search. Runs weighted A* starting at start_weight, and after each 
+    solution lowers the weight by weight_step (down to 1) and keeps improving it, reusing 
+    the previous search: g values and parents are kept, states whose g improved after 
+    they were closed are carried over (INCONS) into the next open list, and the open list 
+    is just re-keyed for the new weight. Stops when the weight-1 search finishes or the 
+    wall-clock budget (seconds) runs out, returning the best path found so far. The first 
+    path is always completed even if that takes longer than the budget.
+    """
+    deadline = time.perf_counter() + budget
+
+    grid = maze.compact()
+    mst = mst_cache(maze, persist_distances)
+    dist = waypoint_distances(maze, persist_distances)
+    bits = {cell: 1 << i for i, cell in enumerate(grid.waypoints)}
+
+    #states are single ints: mask << shift | cell id
+    shift = len(grid).bit_length()
+    cells = (1 << shift) - 1
+
+    steps, parent, hvalue = {}, {}, {}
+    def h(key):
+        if key not in hvalue:
+            hvalue[key] = heuristic(dist, mst, key & cells, key >> shift)
+        return hvalue[key]
+
+    start = (mst.full & ~bits.get(grid.start, 0)) << shift | grid.start
+    steps[start] = 0
+    parent[start] = -1
+
+    weight = start_weight
+    opened = [(weight * h(start), start)]
+    closed, incons = set(), set()
+    best_goal, best_steps, best_path = -1, UNREACHABLE, None
+
+    def best():
+        #the best path found so far, rebuilt from the best goal state
+        path = [best_goal]
+        while parent[path[-1]] >= 0:
+            path.append(parent[path[-1]])
+        path.reverse()
+        return grid.path(key & cells for key in path)
+
+    expansions = 0
+    while True:
+        #improve the current solution with the current weight
+        while len(opened) > 0 and best_steps > opened[0][0]:
+            f, key = heapq.heappop(opened)
+            if key in closed or f != steps[key] + weight * h(key):
+                #stale entry
+                continue
+            closed.add(key)
+
+            expansions += 1
+            if best_path is not None and expansions % 256 == 0 and time.perf_counter() > deadline:
+                #this round may already have improved on the published path
+                return best()
+
+            n_steps = steps[key] + 1
+            mask = key >> shift
+            for n in grid.neighbors(key & cells, key):
+                n_key = (mask & ~bits.get(n, 0)) << shift | n
+                if n_steps < steps.get(n_key, UNREACHABLE):
+                    steps[n_key] = n_steps
+                    parent[n_key] = key
+                    if n_key >> shift == 0:
+                        if n_steps < best_steps:
+                            best_goal, best_steps = n_key, n_steps
+                    elif n_key in closed:
+                        incons.add(n_key)
+                    else:
+                        heapq.heappush(opened, (n_steps + weight * h(n_key), n_key))
+
+        #publish the solution for this weight
+        if best_goal >= 0:
+            best_path = best()
+
+        if weight <= 1 or len(opened) + len(incons) == 0 or time.perf_counter() > deadline:
+            return best_path
+
+        #tighten the weight and reuse open + inconsistent states, re-keyed
+        weight = max(1, weight - weight_step)
+        keys = set(key for f, key in opened if key not in closed) | incons
+        opened = [(steps[key] + weight * h(key), key) for key in keys]
+        heapq.heapify(opened)
+        closed, incons = set(), set()
+
+class ReducedGraph:
+    """
+    weighted graph equivalent of a maze for shortest-path purposes. dead ends without 
+    waypoints are pruned recursively (no shortest path between kept cells enters them), 
+    then every chain of degree-2 cells is contracted into one weighted edge between its 
+    end cells. nodes are the start, the waypoints and the remaining junctions, as cell 
+    ids; `edges[u]` lists (v, length, corridor) where corridor holds the ids of the 
+    cells strictly between u and v, in order, so edges can be expanded back into cells.
+    """
+    def __init__(self, maze):
+        grid = maze.compact()
+        offsets, targets = grid.offsets, grid.targets
+        keep = set(grid.waypoints)
+        keep.add(grid.start)
+
+        alive = bytearray(grid.passable)
+        degree = array('i', (offsets[x + 1] - offsets[x] for x in range(len(grid))))
+
+        #prune dead ends recursively
+        q = deque(x for x in range(len(grid)) if alive[x] and degree[x] <= 1 and x not in keep)
+        while len(q) > 0:
+            curr = q.popleft()
+            if not alive[curr]:
+                continue
+            alive[curr] = 0
+            for n in targets[offsets[curr] : offsets[curr + 1]]:
+                if alive[n]:
+                    degree[n] -= 1
+                    if degree[n] <= 1 and n not in keep:
+                        q.append(n)
+
+        def live(x):
+            return [n for n in targets[offsets[x] : offsets[x + 1]] if alive[n]]
+
+        self.nodes = [x for x in range(len(grid)) if alive[x] and (degree[x] != 2 or x in keep)]
+        nodes = set(self.nodes)
+
+        #contract corridors, keeping the shortest edge between each pair of nodes
+        self.edges = {}
+        for u in self.nodes:
+            best = {}
+            for n in live(u):
+                prev, curr, corridor = u, n, []
+                while curr not in nodes:
+                    corridor.append(curr)
+                    prev, curr = curr, next(x for x in live(curr) if x != prev)
+                if curr != u and (curr not in best or len(corridor) + 1 < best[curr][1]):
+                    best[curr] = (curr, len(corridor) + 1, tuple(corridor))
+            self.edges[u] = list(best.values())
+
+        self.cells = sum(alive)
+
+def reduced_graph(maze):
+    if maze._reduced_graph is None:
+        maze._reduced_graph = ReducedGraph(maze)
+    return maze._reduced_graph
+
+def astar_reduced(maze, persist_distances = False):
+    """
+    Multi-goal A* (same heuristic as astar_multiple) over the ReducedGraph of the maze 
+    instead of its cells: states are (node, remaining-waypoint mask), edges cost their 
+    corridor length, and each expanded state counts as one explored state. The result 
+    is expanded back into a cell-by-cell path.
 
-    start_mst = MST(list(maze.waypoints))
-    start_to_visit = {}
-    for cell in maze.waypoints:
-        start_to_visit[cell] = True
+    @param maze: The maze to execute the search on.
 
-    start_state = State(maze.start, None, start_to_visit, 1, start_mst.compute_mst_weight(), {maze.start: True}, weight)
+    @return path: a list of tuples containing the coordinates of each state in the computed path
+    """
+    grid = maze.compact()
+    graph = reduced_graph(maze)
+    mst = mst_cache(maze, persist_distances)
+    dist = waypoint_distances(maze, persist_distances)
+    bits = {cell: 1 << i for i, cell in enumerate(grid.waypoints)}
+
+    shift = len(grid).bit_length()
+    cells = (1 << shift) - 1
+
+    start = (mst.full & ~bits.get(grid.start, 0)) << shift | grid.start
+    steps = {start: 0}
+    parent = {start: (-1, ())}
+    hvalue = {start: heuristic(dist, mst, grid.start, start >> shift)}
+    opened = [(hvalue[start], start)]
+
+    final = start
+    while len(opened) > 0:
+        f, key = heapq.heappop(opened)
+        node, mask = key & cells, key >> shift
+        if f != steps[key] + hvalue[key]:
+            #stale entry
+            continue
+        if mask == 0:
+            final = key
+            break
 
-    heapq.heappush(h, start_state)
-    visited_states[start_state] = True
+        grid.expand(node, key)
+        for n, length, corridor in graph.edges[node]:
+            n_key = (mask & ~bits.get(n, 0)) << shift | n
+            n_steps = steps[key] + length
+            if n_steps < steps.get(n_key, UNREACHABLE):
+                steps[n_key] = n_steps
+                parent[n_key] = (key, corridor)
+                if n_key not in hvalue:
+                    hvalue[n_key] = heuristic(dist, mst, n, n_key >> shift)
+                heapq.heappush(opened, (n_steps + hvalue[n_key], n_key))
+
+    #expand edges back into cells
+    path = []
+    key = final
+    while key >= 0:
+        prev, corridor = parent[key]
+        path.append(key & cells)
+        path.extend(reversed(corridor))
+        key = prev
+    path.reverse()
+    return grid.path(path)
 
-    final_state = start_state
+def held_karp(maze, threshold = 15, persist_distances = False):
+    """
+    Exact multi-goal search for mazes with few waypoints. The waypoint distance matrix 
+    is computed once (WaypointDistances), the best visiting order is found with the 
+    Held-Karp DP over (visited-subset, last waypoint), vectorized over all subsets of 
+    the same size with NumPy, and the shortest segments between consecutive waypoints 
+    are stitched into the final path. Each filled DP entry counts as one explored state. 
+    Falls back to astar_multiple when there are more than threshold waypoints.
 
-    while len(h) > 0:
-        curr = heapq.heappop(h)
-        visited_states[curr] = True
-
-        if curr.cell in curr.to_visit:
-            curr.to_visit = deepcopy(curr.to_visit)
-            del curr.to_visit[curr.cell]
-
-            if len(curr.to_visit) == 0:
-                final_state = curr
-                break
-            
-            temp_mst = MST(curr.to_visit.keys())
-            curr.mst_weight = temp_mst.compute_mst_weight()
-            curr.weight = heuristic(curr) + curr.steps
-
-            curr.visited.clear()
-            # curr.visited[curr.cell] = True
-
-        for n in maze.neighbors(curr.cell[0], curr.cell[1]):
-            #deepcopy is slow. Don't call unless necessary
-            # temp = State(n, curr, curr.to_visit, curr.steps + 1, curr.mst_weight, {}, 1)
-            temp = State(n, curr, curr.to_visit, curr.steps + 1, curr.mst_weight, curr.visited, weight)
-
-            if temp not in visited_states:
-                if n not in temp.visited:
-                    temp.visited = deepcopy(curr.visited)
-                    temp.visited[n] = True
-                    visited_states[temp] = True
-                    # print("cell: " + str(temp.cell) + ", mst_weights: " + str(temp.mst_weight) + ", weight: " + str(temp.weight))
-                    # print("cell: " + str(temp.cell) + ", path length: " + str(temp.steps))
-                    # print
-                    heapq.heappush(h, temp)
-
-    print(final_state.cell)
-    return backtrack(start_state, final_state)
-    
-            
+    @param maze: The maze to execute the search on.
+
+    @return path: a list of tuples containing the coordinates of each state in the computed path
+    """
+    k = len(maze.waypoints)
+    if k == 0:
+        #nothing left to visit, the start alone is the path
+        return [maze.start]
+    if k > threshold:
+        return astar_multiple(maze, persist_distances)
+
+    grid = maze.compact()
+    dist = waypoint_distances(maze, persist_distances)
+    between = dist.matrix[:k, :k].astype(np.int64)
+    from_start = dist.matrix[k, :k].astype(np.int64)
+
+    #dp[mask, j]: shortest walk from the start visiting exactly the waypoints in mask, ending at j
+    infinity = np.int64(1) << 48
+    masks = np.arange(1 << k, dtype = np.int64)
+    size = np.zeros(1 << k, dtype = np.int64)
+    for i in range(k):
+        size += (masks >> i) & 1
+    dp = np.full((1 << k, k), infinity, dtype = np.int64)
+    parent = np.full((1 << k, k), -1, dtype = np.int64)
+    dp[1 << np.arange(k), np.arange(k)] = from_start
+    maze.states_explored += k
+
+    for p in range(1, k):
+        layer = masks[size == p]
+        #best predecessor i for every (mask, next waypoint j) of this layer at once
+        candidates = dp[layer][:, :, None] + between[None, :, :]
+        best = np.argmin(candidates, axis = 1)
+        value = np.take_along_axis(candidates, best[:, None, :], axis = 1)[:, 0, :]
+        for j in range(k):
+            free = (layer >> j) & 1 == 0
+            targets = layer[free] | (1 << j)
+            dp[targets, j] = value[free, j]
+            parent[targets, j] = best[free, j]
+            maze.states_explored += len(targets)
+
+    #recover the visiting order backwards from the cheapest full tour
+    mask = (1 << k) - 1
+    last = int(np.argmin(dp[mask]))
+    order = []
+    while last >= 0:
+        order.append(last)
+        mask, last = mask & ~(1 << last), int(parent[mask, last])
+    order.reverse()
+
+    #stitch shortest segments by walking down each target's distance field
+    path = [grid.start]
+    for j in order:
+        field = dist.rows[j]
+        curr = path[-1]
+        while field[curr] > 0:
+            curr = next(n for n in grid.targets[grid.offsets[curr] : grid.offsets[curr + 1]] 
+                if field[n] == field[curr] - 1)
+            path.append(curr)
+    return grid.path(path)
@@ -0,0 +1,113 @@
+"""
+This file caches search results on disk so that re-running an unchanged maze with an
+unchanged search is near-instant. Entries are keyed by a hash of the maze file bytes,
+the search method and its parameters, and the source of `search.py` and `maze.py`, so
+editing a solver invalidates its results. Each entry stores the path and
+`states_explored` in a small binary format:
+
+    magic (4 bytes) | states explored (u64) | width (u32) | path length (u32) | cell ids (u32 each)
+
+where a cell id is `row * width + col`. When the cache directory grows past `max_bytes`,
+the least recently used entries are deleted. Searches run with a time `budget` bypass
+the cache, since their result depends on how fast the run was.
+"""
+
+import hashlib, os, struct, sys
+from array import array
+
+import maze as maze_module
+import search
+
+MAGIC       = b'MP1S'
+HEADER      = struct.Struct('<4sQII')
+CACHE_DIR   = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.solution_cache')
+MAX_BYTES   = 64 * 1024 * 1024
+
+def source_digest():
+    """Returns a digest of the solver sources, so that edits invalidate cached results"""
+    digest = hashlib.sha256()
+    for module in (search, maze_module):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.digest()
+
+def cache_key(maze, method, params):
+    digest = hashlib.sha256()
+    with open(maze.filepath, 'rb') as file:
+        digest.update(file.read())
+    digest.update(method.encode())
+    digest.update(repr(sorted((params or {}).items())).encode())
+    digest.update(source_digest())
+    return digest.hexdigest()
+
+def load(path, width):
+    """Returns (path, states explored) stored in a cache entry, or None if it is unreadable"""
+    try:
+        with open(path, 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, states_explored, stored_width, length = HEADER.unpack_from(data)
+    if magic != MAGIC or stored_width != width or len(data) != HEADER.size + 4 * length:
+        return None
+    ids = array('I')
+    ids.frombytes(data[HEADER.size:])
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    return [divmod(x, width) for x in ids], states_explored
+
+def store(path, solution, states_explored, width):
+    ids = array('I', (i * width + j for i, j in solution))
+    if sys.byteorder == 'big':
+        ids.byteswap()
+    temp = path + '.tmp'
+    with open(temp, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, states_explored, width, len(ids)))
+        file.write(ids.tobytes())
+    os.replace(temp, path)
+
+def evict(directory, max_bytes):
+    """Deletes least recently used entries until the cache fits in max_bytes"""
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+def solve(maze, method, params = None, use_cache = True, directory = CACHE_DIR, max_bytes = MAX_BYTES):
+    """
+    Returns the path computed by `search.<method>(maze, **params)`, from the cache when
+    possible. `maze.states_explored` is set to the (cached or fresh) count either way.
+    """
+    params  = params or {}
+    # budgeted (anytime) results depend on wall-clock time, so they are never cached
+    if not use_cache or params.get('budget') is not None:
+        return getattr(search, method)(maze, ** params)
+
+    width   = maze.size.x
+    path    = os.path.join(directory, cache_key(maze, method, params))
+    cached  = load(path, width)
+    if cached is not None:
+        os.utime(path)
+        solution, maze.states_explored = cached
+        return solution
+
+    solution = getattr(search, method)(maze, ** params)
+    os.makedirs(directory, exist_ok = True)
+    store(path, solution, maze.states_explored, width)
+    evict(directory, max_bytes)
+    return solution
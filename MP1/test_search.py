@@ -0,0 +1,32 @@
+"""
+Checks for search.held_karp; run with `python -m unittest test_search` (or pytest).
+"""
+
+import os, tempfile, unittest
+
+from maze import Maze
+import search
+
+def write_maze(directory, rows):
+    path = os.path.join(directory, 'maze')
+    with open(path, 'w') as file:
+        file.write('\n'.join(rows) + '\n')
+    return path
+
+class HeldKarpTest(unittest.TestCase):
+    def test_no_waypoints(self):
+        with tempfile.TemporaryDirectory() as directory:
+            maze = Maze(write_maze(directory, ['%%%%%', '% P %', '%%%%%']))
+            self.assertEqual(maze.waypoints, ())
+            self.assertEqual(search.held_karp(maze), [maze.start])
+
+    def test_matches_astar_multiple(self):
+        for name in 'tiny', 'small_self', 'medium_self':
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'part-3', name)
+            maze = Maze(path)
+            solution = search.held_karp(maze)
+            self.assertIsNone(maze.validate_path(solution))
+            self.assertEqual(len(solution), len(search.astar_multiple(Maze(path))))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Opt-in search instrumentation. A `Tracer` attached to a maze sees every call to
+`Maze.neighbors` / `CompactGrid.neighbors` (an expansion), and while it is active it
+also counts the heap pushes and pops made by `search.py` by temporarily swapping the
+module's `heapq` for a counting proxy, so solver code does not need to change.
+
+    with Tracer(maze) as tracer:
+        path = search.astar_multiple(maze)
+    tracer.write_heatmap('expansions.pgm')
+
+Expansions are counted per cell: multi-waypoint searches expand the same cell once per
+remaining-waypoint mask, so `cell_revisits` (expansions of a cell after its first) is
+not a count of re-expanded search states. Searches over (cell, mask) states
+(`astar_multiple`, `fast`, `astar_reduced`) also report the state they expand, and
+`reexpansions` counts expansions of a state that was already expanded, i.e. the work
+redone because the heuristic is not consistent; it is None for searches that do not
+report states.
+
+Every expansion, push and pop becomes an event `(kind, expansions, cell, frontier)`,
+where `frontier` is the combined size of the heaps the search is using (searches that
+keep their frontier in a deque, like `bfs`, report 0). Events go to the optional
+callback and into a ring buffer holding the most recent `buffer` of them; the frontier
+size is also sampled on every expansion into `frontier_sizes`.
+"""
+
+import argparse, heapq, json
+from collections import deque
+
+from maze import Maze
+import search
+
+class HeapProxy:
+    """Stands in for the `heapq` module and reports pushes and pops to a tracer"""
+    def __init__(self, tracer):
+        self.tracer = tracer
+
+    def heappush(self, heap, item):
+        heapq.heappush(heap, item)
+        self.tracer.push(heap)
+
+    def heappop(self, heap):
+        item = heapq.heappop(heap)
+        self.tracer.pop(heap)
+        return item
+
+    def heapify(self, heap):
+        heapq.heapify(heap)
+        self.tracer.resize(heap)
+
+    def __getattr__(self, name):
+        return getattr(heapq, name)
+
+class Tracer:
+    def __init__(self, maze, callback = None, buffer = 4096):
+        self.maze               = maze
+        self.callback           = callback
+        self.events             = deque(maxlen = buffer)
+
+        self.expansions         = 0
+        self.cell_revisits      = 0
+        self.reexpansions       = 0
+        self.states             = {}
+        self.pushes             = 0
+        self.pops               = 0
+        self.counts             = [0] * (maze.size.x * maze.size.y)
+        self.frontier_sizes     = []
+
+        # last known size of every heap the search touched, by id
+        self.heaps              = {}
+        self.frontier           = 0
+        self.saved_heapq        = None
+
+    def __enter__(self):
+        self.maze.tracer    = self
+        self.saved_heapq    = search.heapq
+        search.heapq        = HeapProxy(self)
+        return self
+
+    def __exit__(self, * exc_info ):
+        search.heapq        = self.saved_heapq
+        self.maze.tracer    = None
+        return False
+
+    def emit(self, kind, cell):
+        event = (kind, self.expansions, cell, self.frontier)
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def resize(self, heap):
+        self.frontier      += len(heap) - self.heaps.get(id(heap), 0)
+        self.heaps[id(heap)] = len(heap)
+
+    def expand(self, i, j, state = None):
+        x = i * self.maze.size.x + j
+        self.expansions    += 1
+        self.counts[x]     += 1
+        if self.counts[x] > 1:
+            self.cell_revisits += 1
+        if state is not None:
+            self.states[state] = self.states.get(state, 0) + 1
+            if self.states[state] > 1:
+                self.reexpansions += 1
+        self.frontier_sizes.append(self.frontier)
+        self.emit('expand', (i, j))
+
+    def push(self, heap):
+        self.pushes        += 1
+        self.resize(heap)
+        self.emit('push', None)
+
+    def pop(self, heap):
+        self.pops          += 1
+        self.resize(heap)
+        self.emit('pop', None)
+
+    def summary(self):
+        return {
+            'expansions'        : self.expansions,
+            'cell_revisits'     : self.cell_revisits,
+            'states_expanded'   : len(self.states) if self.states else None,
+            'reexpansions'      : self.reexpansions if self.states else None,
+            'cells_expanded'    : sum(1 for count in self.counts if count > 0),
+            'max_cell_expansions': max(self.counts),
+            'heap_pushes'       : self.pushes,
+            'heap_pops'         : self.pops,
+            'max_frontier'      : max(self.frontier_sizes, default = 0),
+        }
+
+    def write_heatmap(self, path):
+        """
+        Writes expansion counts per cell as a binary PGM image: walls are black,
+        unexpanded open cells white, and expanded cells from light to dark grey as
+        their count approaches the maximum.
+        """
+        width, height   = self.maze.size
+        peak            = max(max(self.counts), 1)
+        pixels          = bytearray()
+        for i in range(height):
+            for j in range(width):
+                count = self.counts[i * width + j]
+                if self.maze[i, j] == self.maze.legend.wall:
+                    pixels.append(0)
+                elif count == 0:
+                    pixels.append(255)
+                else:
+                    pixels.append(224 - (192 * count) // peak)
+        with open(path, 'wb') as file:
+            file.write('P5\n{0} {1}\n255\n'.format(width, height).encode())
+            file.write(pixels)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description     = 'CS440 MP1 search tracing',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('path',
+                        help = 'path to maze file')
+    parser.add_argument('--search', dest = 'search', type = str, default = 'astar_multiple',
+                        help = 'search method')
+    parser.add_argument('--heatmap', dest = 'heatmap', type = str, default = None,
+                        help = 'write a PGM heatmap of expansions per cell to this file')
+
+    arguments   = parser.parse_args()
+    maze        = Maze(arguments.path)
+    with Tracer(maze) as tracer:
+        path    = getattr(search, arguments.search)(maze)
+    if arguments.heatmap is not None:
+        tracer.write_heatmap(arguments.heatmap)
+    print(json.dumps(dict(tracer.summary(), path_length = len(path))))
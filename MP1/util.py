@@ -0,0 +1,48 @@
+"""
+Small helpers shared by the MP1 scripts.
+"""
+
+import concurrent.futures, contextlib, signal, sys
+
+def peak_memory_kb():
+    # high-water mark of this process' resident set size, or None where unsupported
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class Timeout(Exception):
+    pass
+
+@contextlib.contextmanager
+def time_limit(seconds):
+    """
+    Raises Timeout inside the block once `seconds` of wall-clock time have passed. Uses
+    SIGALRM where available (not on Windows), elsewhere or with None there is no limit.
+    """
+    def expire(signum, frame):
+        raise Timeout()
+
+    alarm = seconds is not None and hasattr(signal, 'setitimer')
+    if alarm:
+        previous = signal.signal(signal.SIGALRM, expire)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+def fresh_worker_pool(jobs):
+    """
+    ProcessPoolExecutor with `jobs` workers (0 or None: one per core) that runs every
+    task in a fresh worker, so that a task's peak memory is its own.
+    """
+    try:
+        return concurrent.futures.ProcessPoolExecutor(jobs or None, max_tasks_per_child = 1)
+    except TypeError:
+        # python < 3.11: workers are reused, so peak memory is a per-worker high-water mark
+        return concurrent.futures.ProcessPoolExecutor(jobs or None)
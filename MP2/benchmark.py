@@ -0,0 +1,69 @@
+"""
+Times configuration-space construction for the maps in a config file: the serial
+batched builder (`batch_maze_ascii`) against the process-pool builder
+(`parallel_maze_ascii`), per map and granularity, and reports the speedup. Each build
+is timed `--repeat` times and the fastest run is kept. `--loop` also times the
+per-configuration `char_to_add` loop, which is slow at small granularities.
+"""
+
+import argparse, configparser, os, time
+
+from util import load_map
+import transform
+
+def loop_maze_ascii(alien, goals, walls, window, granularity):
+    # the per-configuration path of transformToMaze, without the start marker
+    row, col = int(window[1] / granularity) + 1, int(window[0] / granularity) + 1
+    walls = transform.WallIndex(walls)
+    return [[[transform.char_to_add((x, y, level), alien, granularity, goals, walls, [0, 0, 0])
+        for level in range(3)] for y in range(row)] for x in range(col)]
+
+def best_time(build, repeat):
+    times = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        result = build()
+        times.append(time.perf_counter() - time_start)
+    return min(times), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description     = 'CS440 MP2 configuration space benchmark',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('--config', dest = 'configfile', type = str, default = os.path.join('maps', 'test_config.txt'),
+                        help = 'configuration file')
+    parser.add_argument('--maps', dest = 'maps', type = str, nargs = '+', default = None,
+                        help = 'map sections to build (default: every section with a StartPoint)')
+    parser.add_argument('--granularities', dest = 'granularities', type = int, nargs = '+', default = [2, 5, 8, 10],
+                        help = 'granularities to build at')
+    parser.add_argument('--jobs', dest = 'jobs', type = int, default = 0,
+                        help = 'worker processes for the parallel builder (0: one per core)')
+    parser.add_argument('--repeat', dest = 'repeat', type = int, default = 3,
+                        help = 'runs per build, the fastest is reported')
+    parser.add_argument('--loop', dest = 'loop', default = False, action = 'store_true',
+                        help = 'also time the per-configuration char_to_add loop (run once)')
+
+    arguments   = parser.parse_args()
+    config      = configparser.ConfigParser()
+    config.read(arguments.configfile)
+    maps        = arguments.maps or [name for name in config.sections() if config.has_option(name, 'StartPoint')]
+    jobs        = arguments.jobs or os.cpu_count()
+
+    print('{0:>14} {1:>5} {2:>10} {3:>10} {4:>8} {5:>10}'.format('map', 'gran', 'serial', 'parallel', 'speedup', 'loop'))
+    for granularity in arguments.granularities:
+        for map_name in maps:
+            alien, goals, walls, window = load_map(config, map_name)
+            serial, expected = best_time(lambda: transform.batch_maze_ascii(alien, goals, walls, window, granularity), arguments.repeat)
+            parallel, result = best_time(lambda: transform.parallel_maze_ascii(alien, goals, walls, window, granularity, jobs), arguments.repeat)
+            if result != expected:
+                raise RuntimeError('parallel builder disagrees with the serial one on {0} at granularity {1}'.format(map_name, granularity))
+
+            loop = ''
+            if arguments.loop:
+                loop, result = best_time(lambda: loop_maze_ascii(alien, goals, walls, window, granularity), 1)
+                if result != expected:
+                    raise RuntimeError('char_to_add loop disagrees with the batched builder on {0} at granularity {1}'.format(map_name, granularity))
+                loop = '{0:.3f}'.format(loop)
+            print('{0:>14} {1:>5} {2:>10.3f} {3:>10.3f} {4:>7.2f}x {5:>10}'.format(
+                map_name, granularity, serial, parallel, serial / parallel, loop))
@@ -0,0 +1,78 @@
+"""
+This file caches configuration-space mazes on disk, so that running `mp2.py` again on
+the same map skips `transformToMaze`. Entries are keyed by a hash of the map's section
+of the config file, the alien's lengths, widths and shapes, the granularity, and the
+source of the modules the transformation depends on, so editing any of them
+invalidates old entries. Each entry is a compressed `.npz` file holding the maze as a
+(num_cols, num_rows, num_levels) uint8 array of indices into `CHARS`.
+"""
+
+import hashlib, os, zipfile
+
+import numpy as np
+
+from const import *
+from maze import Maze
+import alien as alien_module
+import geometry, transform, util
+
+CACHE_DIR   = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cspace_cache')
+CHARS       = np.array([SPACE_CHAR, WALL_CHAR, OBJECTIVE_CHAR, START_CHAR])
+
+def source_digest():
+    """Returns a digest of the transformation sources, so that edits invalidate cached mazes"""
+    digest = hashlib.sha256()
+    for module in (transform, geometry, alien_module, util):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.digest()
+
+def cache_key(section, lengths, widths, shapes, granularity):
+    """
+    section is the list of (option, value) pairs of the map in the config file,
+    e.g. `config.items(map_name)`
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(sorted(section)).encode())
+    digest.update(repr((list(lengths), list(widths), list(shapes), granularity)).encode())
+    digest.update(source_digest())
+    return digest.hexdigest()
+
+def load(path):
+    """Returns the maze_ascii stored in a cache entry, or None if it is missing or unreadable"""
+    try:
+        with np.load(path) as data:
+            codes = data['codes']
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+    if codes.ndim != 3 or codes.size == 0 or codes.max() >= len(CHARS):
+        return None
+    return CHARS[codes].tolist()
+
+def store(path, maze_ascii):
+    chars = np.array(maze_ascii)
+    codes = np.zeros(chars.shape, dtype = np.uint8)
+    for i, char in enumerate(CHARS):
+        codes[chars == char] = i
+    temp = path + '.tmp'
+    with open(temp, 'wb') as file:
+        np.savez_compressed(file, codes = codes)
+    os.replace(temp, path)
+
+def transform_to_maze(alien, goals, walls, window, granularity, key, use_cache = True, directory = CACHE_DIR, jobs = 1):
+    """
+    Returns the same maze as `transformToMaze(alien, goals, walls, window, granularity, jobs = jobs)`,
+    from the cache entry `key` (see `cache_key`) when there is one.
+    """
+    if not use_cache:
+        return transform.transformToMaze(alien, goals, walls, window, granularity, jobs = jobs)
+
+    path        = os.path.join(directory, key + '.npz')
+    maze_ascii  = load(path)
+    if maze_ascii is not None:
+        return Maze(maze_ascii, alien, granularity)
+
+    maze = transform.transformToMaze(alien, goals, walls, window, granularity, jobs = jobs)
+    os.makedirs(directory, exist_ok = True)
+    store(path, maze.get_map())
+    return maze
@@ -118,18 +118,156 @@ def min_dist_point_to_line(dot, line):
 
     return min(dist1, dist2, dist3)
 
+# Batch kernels: the distance functions above for whole arrays of points and segments at 
+# once. They do the same floating point operations in the same order, but square by 
+# multiplying where math.pow may round differently, so entries can differ from the scalar 
+# functions in the last bits; contact tests use np.isclose, which absorbs that. Points 
+# are arrays with a trailing axis of (x, y), segments with a trailing axis of (startx, 
+# starty, endx, endy); leading axes broadcast, e.g. poses of shape (n, 1, 4) against 
+# walls of shape (m, 4) give (n, m).
+
+def point_to_segment_xy(px, py, x0, y0, x1, y1):
+    #min_dist_point_to_line on coordinate arrays
+    vx, vy = x1 - x0, y1 - y0
+    dist1 = np.sqrt((px - x0) ** 2 + (py - y0) ** 2)
+    dist2 = np.sqrt((px - x1) ** 2 + (py - y1) ** 2)
+    dot1 = vx * (px - x0) + vy * (py - y0)
+    dot2 = vx * (px - x1) + vy * (py - y1)
+    sign1, sign2 = np.sign(dot1), np.sign(dot2)
+
+    #projection onto the segment, only used where the signs differ (so length > 0)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        length = np.sqrt(vx ** 2 + vy ** 2)
+        proj = dot1 / length
+        dist3 = np.sqrt((px - (x0 + proj * vx / length)) ** 2 + (py - (y0 + proj * vy / length)) ** 2)
+    inner = np.minimum(np.minimum(dist1, dist2), dist3)
+    return np.where(sign1 == sign2, np.where(sign1 == -1, dist1, dist2), inner)
+
+def orientation_xy(ax, ay, bx, by, cx, cy):
+    #orientation on coordinate arrays: 0 collinear, 1 clockwise, 2 counterclockwise
+    delta = (by - ay) * (cx - bx) - (cy - by) * (bx - ax)
+    return np.where(delta > 0, 1, np.where(delta < 0, 2, 0))
+
+def segments_intersect_xy(ax, ay, bx, by, cx, cy, dx, dy):
+    #check_lines_intersect on coordinate arrays of segments ab and cd
+    o1, o2 = orientation_xy(ax, ay, bx, by, cx, cy), orientation_xy(ax, ay, bx, by, dx, dy)
+    o3, o4 = orientation_xy(cx, cy, dx, dy, ax, ay), orientation_xy(cx, cy, dx, dy, bx, by)
+
+    #collinear case, same endpoint swaps as check_collinear_intersect
+    flip = bx < ax
+    ax, ay, bx, by = np.where(flip, bx, ax), np.where(flip, by, ay), np.where(flip, ax, bx), np.where(flip, ay, by)
+    flip = dx < cx
+    cx, cy, dx, dy = np.where(flip, dx, cx), np.where(flip, dy, cy), np.where(flip, cx, dx), np.where(flip, cy, dy)
+    overlap = np.maximum(ax, cx) <= np.minimum(bx, dx)
+    flip = by < ay
+    ay, by = np.where(flip, by, ay), np.where(flip, ay, by)
+    flip = dy < cy
+    cy, dy = np.where(flip, dy, cy), np.where(flip, cy, dy)
+    overlap &= np.maximum(ay, cy) <= np.minimum(by, dy)
+
+    collinear = (o1 == 0) & (o2 == 0) & (o3 == 0) & (o4 == 0)
+    return np.where(collinear, overlap, (o1 != o2) & (o3 != o4))
+
+def coordinates(array, size):
+    #splits the trailing axis of an array of points (size 2) or segments (size 4)
+    array = np.asarray(array, dtype = float)
+    if array.shape[-1:] != (size,):
+        raise ValueError('expected a trailing axis of size {0}, got shape {1}'.format(size, array.shape))
+    return [array[..., i] for i in range(size)]
+
+def points_distance(points_a, points_b):
+    """dot_to_dot_dist for broadcast arrays of points"""
+    ax, ay = coordinates(points_a, 2)
+    bx, by = coordinates(points_b, 2)
+    return np.sqrt((ax - bx) ** 2 + (ay - by) ** 2)
+
+def points_to_segments_distance(points, segments):
+    """min_dist_point_to_line for broadcast arrays of points and segments"""
+    return point_to_segment_xy( * coordinates(points, 2), * coordinates(segments, 4))
+
+def segments_intersect(segments_a, segments_b):
+    """check_lines_intersect for broadcast arrays of segments"""
+    return segments_intersect_xy( * coordinates(segments_a, 4), * coordinates(segments_b, 4))
+
+def segments_distance(segments_a, segments_b):
+    """min_dist_between_lines for broadcast arrays of segments"""
+    ax, ay, bx, by = coordinates(segments_a, 4)
+    cx, cy, dx, dy = coordinates(segments_b, 4)
+    dist = np.minimum(
+        np.minimum(point_to_segment_xy(ax, ay, cx, cy, dx, dy), point_to_segment_xy(bx, by, cx, cy, dx, dy)),
+        np.minimum(point_to_segment_xy(cx, cy, ax, ay, bx, by), point_to_segment_xy(dx, dy, ax, ay, bx, by)))
+    return np.where(segments_intersect_xy(ax, ay, bx, by, cx, cy, dx, dy), 0.0, dist)
+
+def within_tolerance(dist, tolerance):
+    """The contact test used throughout this file, `dist < tolerance or np.isclose(dist, tolerance)`, elementwise"""
+    return (dist < tolerance) | np.isclose(dist, tolerance)
+
+class WallIndex:
+    """Uniform grid over wall segments, built once per map. Each grid cell lists the 
+    walls whose bounding box overlaps it, so a query only has to look at walls near a 
+    box instead of all of them. Iterating over the index yields the walls in their 
+    original order, so it can be passed anywhere a list of walls is expected.
+    """
+    def __init__(self, walls, cell_size = None):
+        self.walls = [tuple(wall) for wall in walls]
+        self.boxes = [(min(w[0], w[2]), min(w[1], w[3]), max(w[0], w[2]), max(w[1], w[3])) for w in self.walls]
+
+        if cell_size is None:
+            #about one cell per wall over the extent of the map
+            span = max([max(b[2] - b[0], b[3] - b[1]) for b in self.boxes] + [1])
+            cell_size = max(1, span / max(1, math.ceil(math.sqrt(len(self.walls)))))
+        self.cell_size = cell_size
+
+        self.cells = {}
+        for i, box in enumerate(self.boxes):
+            for key in self.covered(box):
+                self.cells.setdefault(key, []).append(i)
+
+    def __iter__(self):
+        return iter(self.walls)
+
+    def __len__(self):
+        return len(self.walls)
+
+    def covered(self, box):
+        #grid cells overlapping box = (xmin, ymin, xmax, ymax)
+        x0, y0 = math.floor(box[0] / self.cell_size), math.floor(box[1] / self.cell_size)
+        x1, y1 = math.floor(box[2] / self.cell_size), math.floor(box[3] / self.cell_size)
+        return ((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+
+    def query(self, box):
+        """Returns the walls whose bounding box overlaps box = (xmin, ymin, xmax, ymax), in original order"""
+        found = set()
+        for key in self.covered(box):
+            found.update(self.cells.get(key, ()))
+        return [self.walls[i] for i in sorted(found) 
+            if self.boxes[i][0] <= box[2] and box[0] <= self.boxes[i][2] and 
+               self.boxes[i][1] <= box[3] and box[1] <= self.boxes[i][3]]
+
+    def near(self, segment, radius):
+        """Returns the walls that may be within radius of segment = (startx, starty, endx, endy). 
+        radius is padded so that walls at np.isclose distance are kept too."""
+        radius += 1e-8 + 2e-5 * abs(radius)
+        return self.query((min(segment[0], segment[2]) - radius, min(segment[1], segment[3]) - radius, 
+                           max(segment[0], segment[2]) + radius, max(segment[1], segment[3]) + radius))
+
 def does_alien_touch_wall(alien, walls, granularity):
     """ Determine whether the alien touches a wall
 
         Args:
             alien (Alien): Instance of Alien class that will be navigating our map
-            walls (list): List of endpoints of line segments that comprise the walls in the maze in the format [(startx, starty, endx, endx), ...]
+            walls (list): List of endpoints of line segments that comprise the walls in the maze in the format [(startx, starty, endx, endx), ...], 
+                or a WallIndex over them, in which case only walls near the alien are tested
             granularity (int): The granularity of the map
         
         Return:
             True if touched, False if not
     """
     tolerance = alien.get_width() + granularity / math.sqrt(2)
+
+    if isinstance(walls, WallIndex):
+        head, tail = alien.get_head_and_tail()
+        walls = walls.near((head[0], head[1], tail[0], tail[1]), tolerance)
     
     if alien.is_circle():
         center = alien.get_centroid()
@@ -202,16 +340,19 @@ if __name__ == '__main__':
                 (90,55,90,25)]
     goals = [(110, 40, 10)]
     window = (220, 200)
+    wall_index = WallIndex(walls)
 
     def test_helper(alien : Alien, position, truths):
         alien.set_alien_pos(position)
         config = alien.get_config()
 
         touch_wall_result = does_alien_touch_wall(alien, walls, 0) 
+        indexed_wall_result = does_alien_touch_wall(alien, wall_index, 0)
         touch_goal_result = does_alien_touch_goal(alien, goals)
         in_window_result = is_alien_within_window(alien, window, 0)
 
         assert touch_wall_result == truths[0], f'does_alien_touch_wall(alien, walls) with alien config {config} returns {touch_wall_result}, expected: {truths[0]}'
+        assert indexed_wall_result == truths[0], f'does_alien_touch_wall(alien, WallIndex(walls)) with alien config {config} returns {indexed_wall_result}, expected: {truths[0]}'
         assert touch_goal_result == truths[1], f'does_alien_touch_goal(alien, goals) with alien config {config} returns {touch_goal_result}, expected: {truths[1]}'
         assert in_window_result == truths[2], f'is_alien_within_window(alien, window) with alien config {config} returns {in_window_result}, expected: {truths[2]}'
 
@@ -325,6 +466,27 @@ if __name__ == '__main__':
         test_helper(alien_horz, alien_positions[i], alien_horz_truths[i])
         test_helper(alien_vert, alien_positions[i], alien_vert_truths[i])
 
+    #Batch kernels must agree with the scalar functions up to rounding
+    def close(a, b):
+        return math.isclose(a, b, rel_tol = 1e-12, abs_tol = 1e-9)
+
+    poses = []
+    for alien in (alien_horz, alien_vert, edge_horz_alien, edge_vert_alien):
+        for position in alien_positions:
+            alien.set_alien_pos(position)
+            head, tail = alien.get_head_and_tail()
+            poses.append((head[0], head[1], tail[0], tail[1]))
+    poses = np.array(poses)
+    batch_lines = segments_distance(poses[:, None], np.array(walls))
+    batch_points = points_to_segments_distance(poses[:, None, :2], np.array(walls))
+    batch_goals = points_to_segments_distance(np.array(goals)[:, :2], poses[:, None])
+    for i, pose in enumerate(poses):
+        for j, wall in enumerate(walls):
+            assert close(batch_lines[i, j], min_dist_between_lines(tuple(pose), wall)), f'segments_distance({tuple(pose)}, {wall}) differs from min_dist_between_lines'
+            assert close(batch_points[i, j], min_dist_point_to_line(tuple(pose[:2]), wall)), f'points_to_segments_distance({tuple(pose[:2])}, {wall}) differs from min_dist_point_to_line'
+        for j, goal in enumerate(goals):
+            assert close(batch_goals[i, j], min_dist_point_to_line(goal[:2], tuple(pose))), f'points_to_segments_distance({goal[:2]}, {tuple(pose)}) differs from min_dist_point_to_line'
+
     #Edge case coincide line endpoints
     test_helper(edge_horz_alien, edge_horz_alien.get_centroid(), (True, False, False))
     test_helper(edge_horz_alien, (110,55), (True, True, True))
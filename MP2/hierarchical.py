@@ -0,0 +1,97 @@
+"""
+This file contains a coarse-to-fine planner for MP2. The maze is first built with
+`transformToMaze` and searched with `search.bfs` at a coarse granularity (`factor` times
+the requested one); the fine maze is then only computed in a corridor of `radius`
+coarse cells around the coarse path, with everything outside it a wall, and searched
+the same way. If the coarse maze or the corridor has no solution, the whole fine maze
+is built and searched instead. Paths are lists of (x, y, shape) configurations, like
+the ones `search.bfs` returns, at the requested granularity.
+"""
+
+import argparse, configparser, os, time
+
+import numpy as np
+
+from const import *
+from util import *
+from maze import NoObjectiveError
+from search import bfs
+import transform
+
+def corridor(coarse_path, reach, window, granularity):
+    """(num_cols, num_rows) mask of the fine (x, y) cells within reach pixels of the coarse path on both axes"""
+    columns, rows = transform.config_axes(window, granularity)
+    mask = np.zeros((len(columns), len(rows)), dtype = bool)
+    for x, y, _ in coarse_path:
+        mask |= np.outer(np.abs(columns - x) <= reach, np.abs(rows - y) <= reach)
+    return mask
+
+def solve(alien, goals, walls, window, granularity, mask = None):
+    """bfs on the maze transformToMaze builds, or None if the maze has no goal to reach"""
+    try:
+        maze = transform.transformToMaze(alien, goals, walls, window, granularity, mask = mask)
+    except NoObjectiveError:
+        return None
+    return bfs(maze)
+
+def hierarchical_search(alien, goals, walls, window, granularity, factor = 4, radius = 1, stats = None):
+    """
+    Returns a path of (x, y, shape) configurations at `granularity` from the alien's
+    configuration to a goal, or None if there is none. `stats`, if given, is a dict
+    that receives the stage the path came from ('corridor' or 'full') and the number
+    of fine (x, y) cells whose configurations were computed.
+    """
+    stats = {} if stats is None else stats
+    coarse_granularity = granularity * factor
+    coarse_path = solve(alien, goals, walls, window, coarse_granularity)
+
+    path = None
+    columns, rows = transform.config_axes(window, granularity)
+    if coarse_path is not None:
+        #the coarse start is within one coarse step of the fine one, so radius >= 1 covers it
+        mask = corridor(coarse_path, max(radius, 1) * coarse_granularity, window, granularity)
+        stats.update(stage = 'corridor', cells = int(mask.sum()))
+        path = solve(alien, goals, walls, window, granularity, mask)
+
+    if path is None:
+        stats.update(stage = 'full', cells = stats.get('cells', 0) + len(columns) * len(rows))
+        path = solve(alien, goals, walls, window, granularity)
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description     = 'CS440 MP2 coarse-to-fine planner',
+        formatter_class = argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument('--config', dest = 'configfile', type = str, default = os.path.join('maps', 'test_config.txt'),
+                        help = 'configuration file')
+    parser.add_argument('--map', dest = 'map_name', type = str, default = 'Test1',
+                        help = 'map section')
+    parser.add_argument('--granularity', dest = 'granularity', type = int, default = DEFAULT_GRANULARITY,
+                        help = 'granularity of the returned path')
+    parser.add_argument('--factor', dest = 'factor', type = int, default = 4,
+                        help = 'coarse granularity as a multiple of the fine one')
+    parser.add_argument('--radius', dest = 'radius', type = int, default = 1,
+                        help = 'corridor half-width around the coarse path, in coarse cells')
+    parser.add_argument('--check', dest = 'check', default = False, action = 'store_true',
+                        help = 'also search the full fine maze and validate the path with Maze.isValidPath')
+
+    arguments   = parser.parse_args()
+    config      = configparser.ConfigParser()
+    config.read(arguments.configfile)
+    alien, goals, walls, window = load_map(config, arguments.map_name)
+
+    stats       = {}
+    time_start  = time.perf_counter()
+    path        = hierarchical_search(alien, goals, walls, window, arguments.granularity,
+        arguments.factor, arguments.radius, stats)
+    time_total  = time.perf_counter() - time_start
+
+    if arguments.check:
+        maze = transform.transformToMaze(alien, goals, walls, window, arguments.granularity)
+        full = bfs(maze)
+        print('full resolution path length: {0}'.format(None if full is None else len(full)))
+        if path is not None:
+            print('isValidPath: {0}'.format(maze.isValidPath(path)))
+    print('stage: {0}, fine cells computed: {1}, time: {2:.3f}s, path length: {3}'.format(
+        stats['stage'], stats['cells'], time_total, None if path is None else len(path)))
@@ -0,0 +1,115 @@
+"""
+This file contains LazyMaze, a Maze for MP2 that does not build the configuration space
+up front. A configuration is checked against walls and goals the first time a search
+asks about it, and the result is memoized in a dense (num_cols, num_rows, num_levels)
+array of codes into transform.MAZE_CHARS, so `search.bfs` only pays for the
+configurations it reaches. Configurations are evaluated in TILE x TILE blocks of (x, y)
+cells of one shape, since the neighbors of a reached configuration are usually reached
+soon after, and one batched check of a block costs about as much as one of a single
+configuration.
+"""
+
+import numpy as np
+
+from const import *
+from util import *
+from maze import Maze
+import transform
+
+# side of the (x, y) blocks evaluated together
+TILE = 8
+
+# code of configurations that have not been evaluated yet
+UNKNOWN = 255
+
+# codes of the objective and start characters in transform.MAZE_CHARS
+OBJECTIVE_CODE = 2
+START_CODE = 3
+
+CHARS = transform.MAZE_CHARS.tolist()
+
+class LazyMaze(Maze):
+    def __init__(self, alien, goals, walls, window, granularity=DEFAULT_GRANULARITY):
+        """Initialize the LazyMaze class
+
+        Args:
+            alien (Alien): the Alien instance, at the start configuration
+            goals (list): [(x, y, r)] of goals
+            walls (list): [(startx, starty, endx, endy)] of walls
+            window (tuple): (width, height) of the window
+            granularity (int): step size of the alien
+        """
+        self.states_explored = 0
+        self.offsets = [0, 0, 0]
+        self.granularity = granularity
+        self.alien = alien
+        self.goals = np.array(goals, dtype = float).reshape(-1, 3)
+        self.walls = np.array(walls, dtype = float).reshape(-1, 4)
+        self.columns, self.rows = transform.config_axes(window, granularity)
+        self.dimensions = [len(self.columns), len(self.rows), len(alien.get_shapes())]
+        self.start_idx = configToIdx(alien.get_config(), self.offsets, granularity, alien)
+        self.start = idxToConfig(self.start_idx, self.offsets, granularity, alien)
+
+        self.codes = np.full(self.dimensions, UNKNOWN, dtype = np.uint8)
+        # codes as nested lists for fast scalar lookups, kept in sync with self.codes
+        self.grid = self.codes.tolist()
+        self.evaluated = 0
+
+    def evaluate(self, x, y, shape):
+        """Computes the codes of the block of configurations holding index (x, y, shape)"""
+        x0, y0 = x - x % TILE, y - y % TILE
+        columns, rows = self.columns[x0 : x0 + TILE], self.rows[y0 : y0 + TILE]
+        saved = self.alien.get_config()
+        codes = transform.shape_codes(self.alien, self.alien.get_shapes()[shape],
+            np.repeat(columns, len(rows)), np.tile(rows, len(columns)), self.goals, self.walls, self.granularity)
+        self.alien.set_alien_config(saved)
+
+        codes = codes.reshape(len(columns), len(rows))
+        self.codes[x0 : x0 + len(columns), y0 : y0 + len(rows), shape] = codes
+        for i, column in enumerate(codes.tolist()):
+            for j, code in enumerate(column):
+                self.grid[x0 + i][y0 + j][shape] = code
+        self.evaluated += codes.size
+
+        #the start is marked like transformToMaze does, even inside a wall or a goal
+        i, j, k = self.start_idx
+        if x0 <= i < x0 + TILE and y0 <= j < y0 + TILE and k == shape:
+            self.codes[i, j, k] = self.grid[i][j][k] = START_CODE
+        return self.grid[x][y][shape]
+
+    def code(self, x, y, shape):
+        code = self.grid[x][y][shape]
+        return self.evaluate(x, y, shape) if code == UNKNOWN else code
+
+    def __getitem__(self, index):
+        i, j, k = index
+        if 0 <= i < self.dimensions[X] and 0 <= j < self.dimensions[Y] and 0 <= k < self.dimensions[SHAPE]:
+            return CHARS[self.code(i, j, k)]
+        else:
+            raise IndexError('cell index ({0}, {1}, {2}) out of range'.format(i, j, k))
+
+    def getChar(self, x, y, shape, part1=False):
+        if part1:
+            return self[x, y, shape]
+        x, y, shape = configToIdx((x, y, shape), self.offsets, self.granularity, self.alien)
+        return CHARS[self.code(x, y, shape)]
+
+    def getStart(self):
+        return self.start
+
+    def getDimensions(self):
+        return self.dimensions
+
+    def get_map(self):
+        """Returns the full maze_ascii, evaluating every remaining configuration"""
+        for x in range(0, self.dimensions[X], TILE):
+            for y in range(0, self.dimensions[Y], TILE):
+                for shape in range(self.dimensions[SHAPE]):
+                    self.code(x, y, shape)
+        return transform.MAZE_CHARS[self.codes].tolist()
+
+    def getObjectives(self):
+        """Returns the list of objective positions, evaluating every remaining configuration"""
+        self.get_map()
+        return [idxToConfig(index, self.offsets, self.granularity, self.alien)
+            for index in zip(*np.nonzero(self.codes == OBJECTIVE_CODE))]
@@ -264,10 +264,12 @@ class Maze:
             bool: True if successfully saved
         """               
         outputMap = ""
-        for shape in range(self.__dimensions[2]):
-            for y in range(self.__dimensions[1]):
-                for x in range(self.__dimensions[0]):
-                    outputMap += self.__map[x][y][shape]
+        maze_map = self.get_map()
+        dimensions = self.getDimensions()
+        for shape in range(dimensions[2]):
+            for y in range(dimensions[1]):
+                for x in range(dimensions[0]):
+                    outputMap += maze_map[x][y][shape]
                 outputMap += "\n"
             outputMap += "#\n"
 
@@ -286,15 +288,20 @@ class Maze:
         Returns:
             string: detailed description on if the path is valid
         """        
-        # First, check whether it moves single hop
+        # shapes in a path are names, compare them by their index
+        def level(shape):
+            return self.alien.get_shapes().index(shape) if isinstance(shape, str) else shape
+
+        # First, check whether it moves single hop: one step in x or y, or one shape change in place
         for i in range(1, len(path)):
             prev = path[i-1]
             cur = path[i]
             dist = abs(prev[0]-cur[0]) + abs(prev[1]-cur[1]) #+ abs(prev[2] - cur[2])
-            if dist != self.granularity:
+            shift = abs(level(prev[2]) - level(cur[2]))
+            if not ((dist == self.granularity and shift == 0) or (dist == 0 and shift == 1)):
+                if shift > 1:
+                    return "Illegal Shape Transformation"
                 return "Not single hop"
-            if(abs(prev[2] - cur[2]) > 1):
-                return "Illegal Shape Transformation"
 
         # Second, check whether it is valid move
         for pos in path:
@@ -303,7 +310,7 @@ class Maze:
 
 
         # Last, check whether it ends up at one of goals
-        if not path[-1] in self.__objective:
+        if not self.isObjective(*path[-1]):
             return "Last position is not a goal state"
 
         return "Valid"
@@ -19,7 +19,9 @@ import copy
 
 from pygame.locals import *
 from alien import Alien
-from transform import transformToMaze
+import cspace_cache
+from lazy_maze import LazyMaze
+from hierarchical import hierarchical_search
 from search import search
 from const import *
 from util import *
@@ -28,12 +30,17 @@ import time
 
 class Application:
 
-	def __init__(self, configfile, map_name, human=True, fps=DEFAULT_FPS):
+	def __init__(self, configfile, map_name, human=True, fps=DEFAULT_FPS, use_cache=True, jobs=1, lazy=False, hierarchical=0):
 		self.running = False
 		self.displaySurface = None
 		self.config = configparser.ConfigParser()
 		self.config.read(configfile)
 		self.fps = fps
+		self.use_cache = use_cache
+		self.jobs = jobs
+		self.lazy = lazy
+		self.hierarchical = hierarchical
+		self.section = self.config.items(map_name)
 		self.__human = human
 		self.clock = pygame.time.Clock()   
 		self.trajectory = []   
@@ -51,6 +58,7 @@ class Application:
 		self.obstacles = eval(self.config.get(map_name, 'Obstacles'))
 		boundary = [(0,0,0,lims[1]),(0,0,lims[0],0),(lims[0],0,lims[0],lims[1]),(0,lims[1],lims[0],lims[1])]
 		self.obstacles.extend(boundary)
+		self.wall_index = WallIndex(self.obstacles)
 		self.goals = eval(self.config.get(map_name, 'Goals'))
 		self.alien_color = BLACK
 		self.alien = Alien(self.centroid,self.lengths,self.widths,self.alien_shapes,self.alien_shape,self.window)
@@ -67,7 +75,7 @@ class Application:
 		self.running = True
 
 	def get_alien_color(self):
-		if does_alien_touch_wall(self.alien, self.obstacles,self.granularity) or not is_alien_within_window(self.alien, self.window,self.granularity):
+		if does_alien_touch_wall(self.alien, self.wall_index,self.granularity) or not is_alien_within_window(self.alien, self.window,self.granularity):
 			self.alien_color = RED
 		elif does_alien_touch_goal(self.alien,self.goals):
 			self.alien_color = GREEN
@@ -86,9 +94,24 @@ class Application:
 		#     currAngle[i] = self.arm.getArmAngle()[i]
 		self.gameLoop()        
 
-		if not self.__human:
+		if not self.__human and self.hierarchical:
+			print("Searching the path coarse to fine...")
+			path = hierarchical_search(self.alien, self.goals, self.obstacles, self.window, granularity, self.hierarchical)
+			if path is None:
+				print("No path found!")
+			else:
+				self.trajectory = path
+				self.gameLoop()
+				print("Done!")
+				self.drawTrajectory(final = True)
+
+		elif not self.__human:
 			print("Transforming a map configuration to a maze...")
-			maze = transformToMaze(self.alien, self.goals, self.obstacles, self.window, granularity)
+			if self.lazy:
+				maze = LazyMaze(self.alien, self.goals, self.obstacles, self.window, granularity)
+			else:
+				key = cspace_cache.cache_key(self.section, self.lengths, self.widths, self.alien_shapes, granularity)
+				maze = cspace_cache.transform_to_maze(self.alien, self.goals, self.obstacles, self.window, granularity, key, self.use_cache, jobs=self.jobs)
 			print("Done!")
 			print("Searching the path...")
 			path = search(maze, searchMethod)
@@ -251,9 +274,19 @@ if __name__ == "__main__":
 						help='degree granularity - default '+str(DEFAULT_GRANULARITY))
 	parser.add_argument('--trajectory', dest="trajectory", type=int, default = 0, 
 						help='leave footprint of rotation trajectory in every x moves - default 0')
+	parser.add_argument('--no-cache', dest="use_cache", default = True, action = "store_false",
+						help='rebuild the configuration space instead of loading it from the cache - default use cache')
+	parser.add_argument('--jobs', dest="jobs", type=int, default = 1,
+						help='worker processes for building the configuration space, 0 for one per core - default 1')
+	parser.add_argument('--lazy', dest="lazy", default = False, action = "store_true",
+						help='check configurations against walls and goals as the search reaches them instead of building the configuration space first - default off')
+	parser.add_argument('--hierarchical', dest="hierarchical", type=int, default = 0,
+						help='search a maze this many times coarser first and refine around its path (see hierarchical.py), 0 for off - default 0')
 	parser.add_argument('--save-maze', dest="saveMaze", type=str, default = None, 
 						help='save the contructed maze to maze file - default not saved')
 	
 	args = parser.parse_args()
-	app = Application(args.configfile, args.map_name, args.human, args.fps)
+	if args.hierarchical and args.saveMaze:
+		parser.error('--save-maze needs a single maze, it cannot be used with --hierarchical')
+	app = Application(args.configfile, args.map_name, args.human, args.fps, args.use_cache, args.jobs, args.lazy, args.hierarchical)
 	app.execute(args.search, args.granularity, args.trajectory, args.saveMaze)
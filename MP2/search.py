@@ -42,8 +42,6 @@ def bfs(maze, ispart1=False):
     doesn't matter which one it is
     """
 
-    points_to_visit = list(maze.getObjectives())
-
     start = maze.getStart()
 
     q = []
@@ -60,7 +58,6 @@ def bfs(maze, ispart1=False):
         curr = q.pop(0)
 
         if maze.isObjective(curr[0], curr[1], curr[2], ispart1):
-            points_to_visit.remove(curr)
             last_waypoint = curr
             has_solution = True
             break
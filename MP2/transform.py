@@ -12,7 +12,9 @@
 This file contains the transform function that converts the robot arm map
 to the maze.
 """
+import concurrent.futures
 import copy
+from multiprocessing import shared_memory
 # from arm import Arm
 from maze import Maze
 from search import *
@@ -44,9 +46,129 @@ def char_to_add(index, alien, granularity, goals, walls, offset):
     elif does_alien_touch_goal(alien, goals):            return '.'
     else:                                                return ' '
 
+# number of configurations evaluated together by the batched builder, bounding the 
+# size of the (configurations x walls) intermediate arrays
+BATCH_SIZE = 4096
+
+# maze characters by code, for builders that produce arrays of codes
+MAZE_CHARS = np.array([SPACE_CHAR, WALL_CHAR, OBJECTIVE_CHAR, START_CHAR])
+
+def config_axes(window, granularity, offset = (0, 0, 0)):
+    """x coordinates of the maze columns and y coordinates of its rows, with idxToConfig's rounding"""
+    row, col = int(window[1] / granularity) + 1, int(window[0] / granularity) + 1
+    return (np.array([int(x * granularity + offset[0]) for x in range(col)], dtype = float), 
+            np.array([int(y * granularity + offset[1]) for y in range(row)], dtype = float))
+
+def shape_codes(alien, shape, xs, ys, goals, walls, granularity):
+    """Codes (indices into MAZE_CHARS) of the configurations (xs[i], ys[i], shape), as 
+    char_to_add would compute them. goals and walls are float arrays of shape (n, 3) 
+    and (n, 4). Leaves the alien in `shape`.
+    """
+    #head and tail relative to the centroid, as Alien.get_head_and_tail computes them
+    alien.set_alien_config([0, 0, shape])
+    (hx, hy), (tx, ty) = alien.get_head_and_tail()
+    width = alien.get_width()
+    wall_tolerance = width + granularity / math.sqrt(2)
+    goal_tolerance = width + goals[:, 2]
+
+    codes = np.zeros(len(xs), dtype = np.uint8)
+    for begin in range(0, len(xs), BATCH_SIZE):
+        x, y = xs[begin : begin + BATCH_SIZE, None], ys[begin : begin + BATCH_SIZE, None]
+        if alien.is_circle():
+            centers = np.stack((x, y), axis = -1)
+            wall_dist = points_to_segments_distance(centers, walls)
+            goal_dist = points_distance(centers, goals[:, :2])
+        else:
+            poses = np.stack((x + hx, y + hy, x + tx, y + ty), axis = -1)
+            wall_dist = segments_distance(poses, walls)
+            goal_dist = points_to_segments_distance(goals[:, :2], poses)
+
+        block = codes[begin : begin + BATCH_SIZE]
+        block[within_tolerance(goal_dist, goal_tolerance).any(axis = -1)] = 2
+        block[within_tolerance(wall_dist, wall_tolerance).any(axis = -1)] = 1
+    return codes
+
+def batch_maze_ascii(alien, goals, walls, window, granularity, offset = (0, 0, 0), mask = None):
+    """Computes the same maze_ascii as calling char_to_add on every (x, y, shape) index, 
+    evaluating all configurations of a shape against all walls and goals at once. If mask, 
+    a (num_cols, num_rows) boolean array, is given, only the (x, y) cells where it is True 
+    are computed and all others are walls. The alien's configuration is restored afterwards.
+    """
+    columns, rows = config_axes(window, granularity, offset)
+    shapes = alien.get_shapes()
+    saved = alien.get_config()
+
+    walls = np.array(walls, dtype = float).reshape(-1, 4)
+    goals = np.array(goals, dtype = float).reshape(-1, 3)
+
+    #configurations in maze_ascii order: x major, then y
+    xs, ys = np.repeat(columns, len(rows)), np.tile(rows, len(columns))
+    codes = np.ones((len(xs), len(shapes)), dtype = np.uint8)
+    cells = slice(None) if mask is None else np.asarray(mask, dtype = bool).reshape(-1)
+    for level, shape in enumerate(shapes):
+        codes[cells, level] = shape_codes(alien, shape, xs[cells], ys[cells], goals, walls, granularity)
+
+    alien.set_alien_config(saved)
+    return MAZE_CHARS[codes].reshape(len(columns), len(rows), len(shapes)).tolist()
+
+# per-process state of parallel_maze_ascii workers, set up by init_worker
+worker = {}
+
+def init_worker(alien, goals, walls, granularity, columns, rows, name, shape):
+    # the alien arrives pickled, so every worker owns (and mutates) its own copy
+    worker.update(alien = alien, goals = goals, walls = walls, granularity = granularity, 
+        columns = columns, rows = rows, name = name, shape = shape)
+
+def build_columns(level, begin, end):
+    """Fills maze columns [begin, end) of one shape level in the shared grid"""
+    columns, rows = worker['columns'][begin : end], worker['rows']
+    shape = worker['alien'].get_shapes()[level]
+    codes = shape_codes(worker['alien'], shape, np.repeat(columns, len(rows)), np.tile(rows, len(columns)), 
+        worker['goals'], worker['walls'], worker['granularity'])
+
+    #attach for this task only, so that no worker holds the block open after it is done
+    memory = shared_memory.SharedMemory(name = worker['name'])
+    try:
+        grid = np.ndarray(worker['shape'], dtype = np.uint8, buffer = memory.buf)
+        grid[begin : end, :, level] = codes.reshape(len(columns), len(rows))
+        del grid
+    finally:
+        memory.close()
+    return end - begin
+
+def parallel_maze_ascii(alien, goals, walls, window, granularity, jobs = None, offset = (0, 0, 0)):
+    """batch_maze_ascii split over a process pool: (column range, shape) blocks are 
+    independent, so each task fills its block of a grid in shared memory. jobs is the 
+    number of worker processes (None or 0: one per core).
+    """
+    columns, rows = config_axes(window, granularity, offset)
+    shape = (len(columns), len(rows), len(alien.get_shapes()))
+    walls = np.array(walls, dtype = float).reshape(-1, 4)
+    goals = np.array(goals, dtype = float).reshape(-1, 3)
+
+    jobs = jobs or os.cpu_count()
+    #a couple of tasks per worker and shape, to even out blocks near walls
+    chunk = max(1, math.ceil(len(columns) / (2 * jobs)))
+
+    memory = shared_memory.SharedMemory(create = True, size = int(np.prod(shape)))
+    try:
+        with concurrent.futures.ProcessPoolExecutor(jobs, initializer = init_worker, 
+            initargs = (copy.deepcopy(alien), goals, walls, granularity, columns, rows, memory.name, shape)) as executor:
+            futures = [executor.submit(build_columns, level, begin, min(begin + chunk, len(columns))) 
+                for level in range(shape[2]) for begin in range(0, len(columns), chunk)]
+            for future in futures:
+                future.result()
+        grid = np.ndarray(shape, dtype = np.uint8, buffer = memory.buf)
+        codes = grid.copy()
+        del grid
+    finally:
+        memory.close()
+        memory.unlink()
+    return MAZE_CHARS[codes].tolist()
+
 import traceback
 
-def transformToMaze(alien, goals, walls, window,granularity):
+def transformToMaze(alien, goals, walls, window,granularity, batched = True, jobs = 1, mask = None):
     """This function transforms the given 2D map to the maze in MP1.
     
         Args:
@@ -54,6 +176,13 @@ def transformToMaze(alien, goals, walls, window,granularity):
             goals (list): [(x, y, r)] of goals
             walls (list): [(startx, starty, endx, endy)] of walls
             window (tuple): (width, height) of the window
+            batched (bool): compute all configurations with NumPy (batch_maze_ascii) 
+                instead of calling char_to_add per configuration
+            jobs (int): worker processes for the batched computation (parallel_maze_ascii) 
+                if not 1, None or 0 for one per core
+            mask (array_like): optional (num_cols, num_rows) booleans, configurations of 
+                (x, y) cells where it is False are walls and are not computed (serially, 
+                with batch_maze_ascii)
 
         Return:
             Maze: the maze instance generated based on input arguments.
@@ -63,20 +192,29 @@ def transformToMaze(alien, goals, walls, window,granularity):
     offset = [0, 0, 0]
 
     start_idx = configToIdx(alien.get_config(), offset, granularity, alien)
-    maze_ascii = []
 
-    #build maze with either ' ', '.', or '%'. remember that maze should be in maze[x][y][level]!
-    for x in range(col):
-        curr_row = []
-        for y in range(row):
-            hori_char = char_to_add((x, y, 0), alien, granularity, goals, walls, offset)
-            vert_char = char_to_add((x, y, 1), alien, granularity, goals, walls, offset)
-            ball_char = char_to_add((x, y, 2), alien, granularity, goals, walls, offset)
-            
-            cell = [hori_char, vert_char, ball_char] #each cell of maze_ascii is list of [a, b, c], where a = char at level 0, b is char at level 1...etc
-            curr_row.append(cell) 
-
-        maze_ascii.append(curr_row)      
+    if mask is not None:
+        maze_ascii = batch_maze_ascii(alien, goals, walls, window, granularity, offset, mask)
+    elif batched and jobs != 1:
+        maze_ascii = parallel_maze_ascii(alien, goals, walls, window, granularity, jobs, offset)
+    elif batched:
+        maze_ascii = batch_maze_ascii(alien, goals, walls, window, granularity, offset)
+    else:
+        maze_ascii = []
+        walls = WallIndex(walls)
+
+        #build maze with either ' ', '.', or '%'. remember that maze should be in maze[x][y][level]!
+        for x in range(col):
+            curr_row = []
+            for y in range(row):
+                hori_char = char_to_add((x, y, 0), alien, granularity, goals, walls, offset)
+                vert_char = char_to_add((x, y, 1), alien, granularity, goals, walls, offset)
+                ball_char = char_to_add((x, y, 2), alien, granularity, goals, walls, offset)
+                
+                cell = [hori_char, vert_char, ball_char] #each cell of maze_ascii is list of [a, b, c], where a = char at level 0, b is char at level 1...etc
+                curr_row.append(cell) 
+
+            maze_ascii.append(curr_row)      
 
     maze_ascii[start_idx[0]][start_idx[1]][start_idx[2]] = 'P' #set start
     maze = Maze(maze_ascii, alien, granularity)
@@ -12,6 +12,8 @@
 This file contains helper functions that helps other modules, 
 """
 
+from alien import Alien
+
 # Transform between alien configs and an array index
 def configToIdx(config, offsets, granularity,alien):
     result = []
@@ -40,3 +42,15 @@ def isValueInBetween(valueRange, target):
     else:
         return True
 
+def load_map(config, map_name):
+    """Returns (alien, goals, obstacles, window) of a map section, parsed as mp2.py does"""
+    window      = eval(config.get(map_name, 'Window'))
+    centroid    = eval(config.get(map_name, 'StartPoint'))
+    widths      = eval(config.get(map_name, 'Widths'))
+    lengths     = eval(config.get(map_name, 'Lengths'))
+    obstacles   = eval(config.get(map_name, 'Obstacles'))
+    obstacles.extend([(0, 0, 0, window[1]), (0, 0, window[0], 0),
+        (window[0], 0, window[0], window[1]), (0, window[1], window[0], window[1])])
+    goals       = eval(config.get(map_name, 'Goals'))
+    alien       = Alien(centroid, lengths, widths, ['Horizontal', 'Ball', 'Vertical'], 'Ball', window)
+    return alien, goals, obstacles, window